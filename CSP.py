@@ -1,14 +1,76 @@
+import colorsys
+import warnings
 from collections import deque
-from typing import Callable, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# the colors of a CSP unless `set_colors` or `from_adjacency` gives another palette, see `palette`
+DEFAULT_COLORS = ["red", "green", "blue", "yellow"]
+
+# colors added after DEFAULT_COLORS by `palette`, before falling back to generated RGB codes
+EXTRA_COLORS = ["orange", "purple", "cyan", "magenta", "brown", "pink", "olive", "teal", "navy", "lime", "maroon",
+                "gold"]
+
+
+def palette(size: int) -> List[str]:
+    """
+    Returns `size` distinct color names that matplotlib can draw, starting with DEFAULT_COLORS.
+
+    Args:
+        size (int): The number of colors.
+
+    Returns:
+        List[str]: The colors.
+
+    Raises:
+        ValueError: If `size` is negative.
+    """
+    if size < 0:
+        raise ValueError(f"a palette cannot have {size} colors")
+    colors = (DEFAULT_COLORS + EXTRA_COLORS)[:size]
+    hue = 0.0
+    while len(colors) < size:
+        # golden-ratio steps around the hue circle keep consecutive generated colors apart
+        hue = (hue + 0.618033988749895) % 1.0
+        r, g, b = colorsys.hsv_to_rgb(hue, 0.65, 0.9)
+        color = f"#{int(r * 255):02x}{int(g * 255):02x}{int(b * 255):02x}"
+        if color not in colors:
+            colors.append(color)
+    return colors
+
+
+class MaskValues(dict):
+    """
+    Maps a domain bitmask to the tuple of the color indices it contains. Entries are computed on first use, so
+    a large palette of k colors does not cost 2**k tuples up front.
+    """
+
+    def __missing__(self, mask: int) -> Tuple[int, ...]:
+        values = self[mask] = tuple(c for c in range(mask.bit_length()) if mask >> c & 1)
+        return values
+
 
 class CSP(object):
     """
     Represents a Constraint Satisfaction Problem (CSP).
 
+    Countries and colors are addressed internally by integer indices. The domain of every variable is a bitmask over
+    the colors of `domain` (DEFAULT_COLORS unless another palette is set) and every change to a domain is recorded
+    on a trail, so undoing a branch of the search is done by popping the trail instead of copying lists.
+
     Attributes:
-        variables (dict): A dictionary that maps variables to their domains.
+        countries (list): The variables of the CSP, in index order.
+        index (dict): A dictionary that maps every country to its integer index.
+        neighbors (list): For every variable index, the list of indices of its neighboring variables.
+        domain (list): The colors that can be assigned to a variable.
+        domains (list): For every variable index, the bitmask of the colors still in its domain.
+        values (list): For every variable index, the index of its assigned color or -1 if it is unassigned.
+        trail (list): A stack of (variable, previous domain, assignment flag) entries used to undo changes.
+        assignments_number (int): The total number of assignments made.
+        consistency_checks (int): The total number of consistency checks made.
+        support (list): When enabled with `enable_support`, for every variable and color (at index
+                        `variable * len(domain) + color`) the number of unassigned neighbors whose domain still
+                        contains the color; None otherwise.
         constraints (list): A list of constraints in the form of [constraint_func, *variables].
-        unassigned_var (list): A list of unassigned variables.
         var_constraints (dict): A dictionary that maps variables to their associated constraints.
 
     Methods:
@@ -21,30 +83,112 @@ class CSP(object):
         Initializes a Constraint Satisfaction Problem (CSP) object.
 
         Args:
-            *args: Variable length argument list.
-            **kwargs: Arbitrary keyword arguments.
-
-        Attributes:
-            variables (dict): A dictionary to store the variables of the CSP.
-            constraints (list): A list to store the constraints of the CSP.
-            unassigned_var (list): A list to store the unassigned variables of the CSP.
-            var_constraints (dict): A dictionary to store the constraints associated with each variable.
-            assignments (dict): A dictionary to store the assignments of the CSP.
+            *args: The countries of the map.
+            **kwargs: For every country, the list of its neighboring countries. Neighbors that are not variables
+                      of the CSP are ignored and the border relation is made symmetric.
         """
-        self.countries=[*args]
+        self.countries = [*args]
         self.borders = {**kwargs}
-        self.domain = ["red", "green", "blue", "yellow"]
+        self.domain = list(DEFAULT_COLORS)
 
+        self.index = {country: i for i, country in enumerate(self.countries)}
+        adjacency = [set() for _ in self.countries]
+        for country, neighbors in self.borders.items():
+            i = self.index.get(country)
+            if i is None:
+                continue
+            for neighbor in neighbors:
+                j = self.index.get(neighbor)
+                if j is not None and j != i:
+                    adjacency[i].add(j)
+                    adjacency[j].add(i)
+        self.neighbors = [sorted(adj) for adj in adjacency]
 
-        self.variables = {}
         self.constraints = []
-        self.unassigned_var = self.countries
         self.var_constraints = {}
-        self.assignments = {}
         self.assignments_number = 0
-        for country in self.countries:
-            self.variables[country] = ["red", "green", "blue", "yellow"]
-            self.assignments[country] = None
+        self.consistency_checks = 0
+        self._reset_domains()
+
+    @classmethod
+    def from_adjacency(cls, countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int],
+                       colors: Optional[Sequence[str]] = None) -> "CSP":
+        """
+        Creates a CSP from an integer adjacency in CSR form, e.g. as returned by `GraphIndex.subgraph`, without
+        going through ISO codes.
+
+        Args:
+            countries (Sequence[str]): The countries of the map, in index order.
+            indptr (Sequence[int]): The offsets of every country's neighbors in `indices`.
+            indices (Sequence[int]): The concatenated neighbor indices of every country.
+            colors (Sequence[str], optional): The colors that can be assigned, see `palette`. Defaults to
+                                              DEFAULT_COLORS.
+
+        Returns:
+            CSP: The CSP of the map.
+        """
+        csp = cls(*countries)
+        csp.neighbors = [list(indices[indptr[i]:indptr[i + 1]]) for i in range(len(csp.countries))]
+        csp.borders = {country: [csp.countries[j] for j in csp.neighbors[i]] for i, country in enumerate(csp.countries)}
+        if colors is not None:
+            csp.set_colors(colors)
+        return csp
+
+    def set_colors(self, colors: Sequence[str]) -> None:
+        """
+        Replaces the colors that can be assigned, giving every variable the full new domain and clearing the
+        assignments.
+
+        Args:
+            colors (Sequence[str]): The colors, see `palette`.
+
+        Returns:
+            None
+        """
+        self.domain = list(colors)
+        self._reset_domains()
+
+    def _reset_domains(self) -> None:
+        """
+        Gives every variable the full domain and clears the assignments and the trail.
+        """
+        size = len(self.domain)
+        self.full_domain = (1 << size) - 1
+        # mask -> tuple of the color indices it contains, shared by every variable; a list indexes faster than
+        # MaskValues but holds every mask, so it is only built for small palettes
+        if size <= 10:
+            self.mask_values = [tuple(c for c in range(size) if mask >> c & 1) for mask in range(1 << size)]
+        else:
+            self.mask_values = MaskValues()
+        self.domains = [self.full_domain] * len(self.countries)
+        self.values = [-1] * len(self.countries)
+        self.assigned_at = [-1] * len(self.countries)
+        self.assigned_count = 0
+        self.trail = []
+        self.support = None
+
+    @property
+    def variables(self) -> Dict[str, List[str]]:
+        """
+        Dict[str, List[str]]: A view that maps every country to the list of colors left in its domain.
+        """
+        return {country: [self.domain[c] for c in self.mask_values[self.domains[i]]]
+                for i, country in enumerate(self.countries)}
+
+    @property
+    def assignments(self) -> Dict[str, Optional[str]]:
+        """
+        Dict[str, Optional[str]]: A view that maps every country to its assigned color or None.
+        """
+        return {country: (self.domain[self.values[i]] if self.values[i] >= 0 else None)
+                for i, country in enumerate(self.countries)}
+
+    @property
+    def unassigned_var(self) -> List[str]:
+        """
+        List[str]: The countries that have not been assigned yet, in index order.
+        """
+        return [country for i, country in enumerate(self.countries) if self.values[i] < 0]
 
 
     def add_constraint(self, constraint_func: Callable, variables: List[str]) -> None:
@@ -59,11 +203,10 @@ class CSP(object):
             None
         """
         "*** YOUR CODE HERE ***"
+        self.constraints.append([constraint_func, *variables])
         for var in variables:
-            
-            self.var_constraints[var].append(constraint_func)
-            self.constraints.append(constraint_func)
-        
+            self.var_constraints.setdefault(var, []).append(constraint_func)
+
     def constraint_func(self, value1, value2):
         if(value1 == value2):
             return False
@@ -79,14 +222,27 @@ class CSP(object):
 
         Args:
             variable: The variable to be added.
-            domain: The domain of the variable.
+            domain: The domain of the variable, a subset of the colors of the CSP.
 
         Returns:
             None
         """
         "*** YOUR CODE HERE ***"
-        self.variables[variable] = domain
-        
+        mask = 0
+        for value in domain:
+            mask |= 1 << self.domain.index(value)
+        i = self.index.get(variable)
+        if i is None:
+            i = len(self.countries)
+            self.countries.append(variable)
+            self.index[variable] = i
+            self.neighbors.append([])
+            self.domains.append(mask)
+            self.values.append(-1)
+            self.assigned_at.append(-1)
+        else:
+            self.domains[i] = mask
+
 
     def assign(self, variable: str, value) -> bool:
         """
@@ -100,14 +256,30 @@ class CSP(object):
             bool: True if the assignment is consistent with the constraints, False otherwise.
         """
         "*** YOUR CODE HERE ***"
-        if(self.is_consistent(variable, value)):
-            self.variables[variable] = value
-            self.assignments[variable] = value
-            self.unassigned_var.remove(variable)
-            self.assignments_number += 1
-            return True
-        
-        return False
+        return self.assign_index(self.index[variable], self.domain.index(value))
+
+    def assign_index(self, var: int, color: int) -> bool:
+        """
+        Assigns the color with index `color` to the variable with index `var`.
+
+        Args:
+            var (int): The index of the variable to be assigned.
+            color (int): The index of the color to be assigned.
+
+        Returns:
+            bool: True if the assignment is consistent with the constraints, False otherwise.
+        """
+        if not self.is_consistent_index(var, color):
+            return False
+        self.assigned_at[var] = len(self.trail)
+        self.trail.append((var, self.domains[var], True))
+        if self.support is not None:
+            self._update_support(var, self.domains[var], -1)
+        self.domains[var] = 1 << color
+        self.values[var] = color
+        self.assigned_count += 1
+        self.assignments_number += 1
+        return True
 
 
     def is_consistent(self, variable: str, value) -> bool:
@@ -122,15 +294,28 @@ class CSP(object):
             bool: True if the assignment is consistent with the constraints, False otherwise.
         """
         "*** YOUR CODE HERE ***"
-        if variable not in self.var_constraints:
-            return True  # No constraints associated with the variable, so assignment is always consistent
-        for neighbors in self.borders[variable]:
-            if self.assignments[neighbors] == value:
+        return self.is_consistent_index(self.index[variable], self.domain.index(value))
+
+    def is_consistent_index(self, var: int, color: int) -> bool:
+        """
+        Checks if no neighbor of the variable with index `var` is assigned the color with index `color`.
+
+        Args:
+            var (int): The index of the variable to be assigned.
+            color (int): The index of the color to be assigned.
+
+        Returns:
+            bool: True if the assignment is consistent with the constraints, False otherwise.
+        """
+        self.consistency_checks += 1
+        values = self.values
+        for neighbor in self.neighbors[var]:
+            if values[neighbor] == color:
                 return False
         return True
 
-    
-    def is_complete(self) -> bool:  
+
+    def is_complete(self) -> bool:
         """
         Checks if the CSP is complete, i.e., all variables have been assigned.
 
@@ -138,12 +323,8 @@ class CSP(object):
             bool: True if the CSP is complete, False otherwise.
         """
         "*** YOUR CODE HERE ***"
-        if(self.assignments_number != len(self.variables)):
-            return False
-        for var,value in self.assignments.items():
-            if not self.is_consistent(var,value):
-                return False
-    
+        return self.assigned_count == len(self.countries)
+
     def is_assigned(self, variable: str) -> bool:
         """
         Checks if a variable has been assigned a value.
@@ -155,23 +336,109 @@ class CSP(object):
             bool: True if the variable has been assigned, False otherwise.
         """
         "*** YOUR CODE HERE ***"
-        if(self.assignments[variable] == self.variables[variable]):
-            return True
-        return False
+        return self.values[self.index[variable]] >= 0
+
+    def prune(self, var: int, mask: int) -> bool:
+        """
+        Removes the colors in `mask` from the domain of the variable with index `var`, recording the change on
+        the trail.
+
+        Args:
+            var (int): The index of the variable whose domain is reduced.
+            mask (int): The bitmask of the colors to be removed.
 
-    def unassign(self, removed_values_from_domain: List[Tuple[str, any]], variable: str) -> None:
+        Returns:
+            bool: False if the domain of the variable became empty, True otherwise.
+        """
+        old = self.domains[var]
+        new = old & ~mask
+        if new != old:
+            self.trail.append((var, old, False))
+            self.domains[var] = new
+            if self.support is not None and self.values[var] < 0:
+                self._update_support(var, old & ~new, -1)
+        return new != 0
+
+    def enable_support(self) -> None:
+        """
+        Builds the `support` table from the current domains and keeps it up to date on every later assignment,
+        pruning and restore.
+        """
+        size = len(self.domain)
+        self.support = [0] * (len(self.countries) * size)
+        for var, domain in enumerate(self.domains):
+            if self.values[var] < 0:
+                self._update_support(var, domain, 1)
+
+    def _update_support(self, var: int, mask: int, delta: int) -> None:
+        """
+        Adds `delta` to the support of the colors in `mask` for every neighbor of the variable with index `var`.
+        """
+        support = self.support
+        size = len(self.domain)
+        for color in self.mask_values[mask]:
+            for neighbor in self.neighbors[var]:
+                support[neighbor * size + color] += delta
+
+    def checkpoint(self) -> int:
+        """
+        Returns a mark of the current trail position that can later be passed to `restore`.
+        """
+        return len(self.trail)
+
+    def restore(self, mark: int) -> None:
         """
-        Unassign a variable and restores its domain values.
+        Undoes every domain change and assignment recorded on the trail since `mark`.
+
+        Args:
+            mark (int): A trail position returned by `checkpoint`.
+
+        Returns:
+            None
+        """
+        trail = self.trail
+        domains = self.domains
+        support = self.support
+        while len(trail) > mark:
+            var, old, assigned = trail.pop()
+            if support is not None:
+                # an assigned variable supports no color of its neighbors
+                self._update_support(var, old if assigned else old & ~domains[var], 1)
+            domains[var] = old
+            if assigned:
+                self.values[var] = -1
+                self.assigned_at[var] = -1
+                self.assigned_count -= 1
+
+    def unassign(self, *args: Any, variable: Optional[str] = None) -> None:
+        """
+        Unassign a variable and restores the domains changed since it was assigned.
+
+        The former `unassign(removed_values_from_domain, variable)` form is still accepted for one release, with a
+        DeprecationWarning: the trail now records the removed values, so the first argument is ignored.
 
         Args:
-            removed_values_from_domain (list): A list of domain values to be restored.
             variable (str): The variable to be unassigned.
 
         Returns:
             None
         """
         "*** YOUR CODE HERE ***"
-        self.unassigned_var.append(variable)
-        self.variables[variable] = removed_values_from_domain
-        del self.assignments[variable]
-        self.assignments_number -= 1
\ No newline at end of file
+        if variable is not None:
+            args += (variable,)
+        if len(args) == 2:
+            warnings.warn("unassign(removed_values_from_domain, variable) is deprecated, use unassign(variable)",
+                          DeprecationWarning, stacklevel=2)
+        elif len(args) != 1:
+            raise TypeError(f"unassign() takes 1 variable but {len(args)} arguments were given")
+        variable = args[-1]
+        mark = self.assigned_at[self.index[variable]]
+        if mark >= 0:
+            self.restore(mark)
+
+    def solution(self) -> List[Tuple[str, str]]:
+        """
+        Returns the current assignments as a list of (country, color) tuples, in index order.
+        """
+        return [(country, self.domain[self.values[i]])
+                for i, country in enumerate(self.countries) if self.values[i] >= 0]
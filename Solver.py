@@ -1,11 +1,25 @@
+import random
+import time
 from collections import deque
-from typing import Callable, List, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 from CSP import CSP
+from dsatur import DSaturQueue
+from instrumentation import Instrumentation
+
+
+class SearchLimitReached(Exception):
+    """
+    Raised inside a search when its node budget is exhausted or it is asked to stop.
+    """
 
 
 class Solver(object):
 
-    def __init__(self, csp: CSP, domain_heuristics: bool = False, variable_heuristics: bool = False, AC_3: bool = False) -> None:
+    def __init__(self, csp: CSP, domain_heuristics: bool = False, variable_heuristics: bool = False, AC_3: bool = False,
+                 forward_checking: bool = False, dsatur: bool = False, seed: Optional[int] = None,
+                 max_nodes: Optional[int] = None, stop: Optional[Callable[[], bool]] = None,
+                 instrumentation: Optional[Instrumentation] = None,
+                 preferred: Optional[Sequence[int]] = None) -> None:
         """
         Initializes a Solver object.
 
@@ -13,12 +27,70 @@ class Solver(object):
             csp (CSP): The Constraint Satisfaction Problem to be solved.
             domain_heuristics (bool, optional): Flag indicating whether to use domain heuristics. Defaults to False.
             variable_heuristics (bool, optional): Flag indicating whether to use variable heuristics. Defaults to False.
-            AC_3 (bool, optional): Flag indicating whether to use the AC-3 algorithm. Defaults to False.
+            AC_3 (bool, optional): Flag indicating whether to use the AC-3 algorithm, both before the search and
+                                   after every assignment (maintaining arc consistency). Defaults to False.
+            forward_checking (bool, optional): Flag indicating whether to remove the assigned value from the
+                                               domains of the neighbors after every assignment. Defaults to False.
+            dsatur (bool, optional): Flag indicating whether to select variables by saturation degree (DSatur),
+                                     ties broken by degree. Takes precedence over MRV. Defaults to False.
+            seed (int, optional): When given, values are tried in a random order seeded with it (LCV ties are
+                                  broken randomly) and the static variable order is shuffled. Defaults to None.
+            max_nodes (int, optional): The number of nodes after which the search gives up. Defaults to None.
+            stop (Callable[[], bool], optional): A function polled every few hundred nodes; the search gives up
+                                                 when it returns True. Defaults to None.
+            instrumentation (Instrumentation, optional): Times the phases of the search and reports its events
+                                                         to hooks and to a trace. Defaults to None, which costs
+                                                         nothing.
+            preferred (Sequence[int], optional): For every variable, the index of a color tried before the
+                                                 others when it is still in the domain, or -1. Keeps a repaired
+                                                 coloring close to a previous one. Defaults to None.
         """
         self.domain_heuristic = domain_heuristics
         self.variable_heuristic = variable_heuristics
         self.AC_3 = AC_3
+        self.forward_checking = forward_checking
+        self.dsatur = dsatur
         self.csp = csp
+        self.variable_queue = None
+        self.random = random.Random(seed) if seed is not None else None
+        self.max_nodes = max_nodes
+        self.stop = stop
+        self.limit_reached = False
+        self.nodes = 0
+        self.backtracks = 0
+        self.arc_revisions = 0
+        self.wipeouts = 0
+        self.preferred = preferred
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.attach(self)
+
+    def statistics(self) -> Dict[str, int]:
+        """
+        Returns the counters of the search: expanded nodes, assignments and consistency checks of the CSP,
+        backtracks (variables that ran out of values), revised arcs and domain wipeouts.
+        """
+        return {
+            "nodes": self.nodes,
+            "assignments": self.csp.assignments_number,
+            "consistency_checks": self.csp.consistency_checks,
+            "backtracks": self.backtracks,
+            "arc_revisions": self.arc_revisions,
+            "wipeouts": self.wipeouts,
+        }
+
+    def count_node(self) -> None:
+        """
+        Counts an expanded node and raises SearchLimitReached when the node budget is exhausted or `stop` asks
+        the search to end.
+        """
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.limit_reached = True
+            raise SearchLimitReached()
+        if self.stop is not None and not self.nodes & 255 and self.stop():
+            self.limit_reached = True
+            raise SearchLimitReached()
 
 
     def backtrack_solver(self) -> List[Tuple[str, str]]:
@@ -26,157 +98,767 @@ class Solver(object):
         Backtracking algorithm to solve the constraint satisfaction problem (CSP).
 
         Returns:
-            List[Tuple[str, str]]: A list of variable-value assignments that satisfy all constraints.
+            List[Tuple[str, str]]: A list of variable-value assignments that satisfy all constraints, or None if
+                                   the CSP has no solution or the search was stopped (see `limit_reached`). When
+                                   arc consistency wipes out a domain or the search is stopped, the domains are
+                                   restored as they were before the call, arc consistency prunings included.
         """
 
         "*** YOUR CODE HERE ***"
+        csp = self.csp
+        countries = csp.countries
+        colors = csp.domain
+
         def backtrack(assignment):
-            if self.csp.is_complete():
+            if csp.is_complete():
                 return assignment
 
+            self.count_node()
             var = self.select_unassigned_variable()
+            mark = csp.checkpoint()
 
             for value in self.ordered_domain_value(var):
-                if self.csp.is_consistent(var, value):
-                    self.csp.assign(var, value)
-                    assignment.append((var, value))
+                if not csp.assign_index(var, value):
+                    continue
+                if queue is not None:
+                    queue.assigned(var)
+                if self.propagate(var):
+                    assignment.append((countries[var], colors[value]))
 
                     result = backtrack(assignment)
                     if result is not None:
-                        return result 
+                        return result
+
+                    assignment.pop()
+                else:
+                    self.wipeouts += 1
+                if queue is not None:
+                    queue.unassigned(var, value)
+                csp.restore(mark)
+            self.backtracks += 1
+            if self.instrumentation is not None:
+                self.instrumentation.backtracked(var)
+            return None
+
+        start = csp.checkpoint()
+        if self.AC_3 and self.apply_AC3() is None:
+            self.wipeouts += 1
+            csp.restore(start)
+            return None
+        queue = self.variable_queue = DSaturQueue(csp) if self.dsatur else None
+        if self.domain_heuristic and csp.support is None:
+            csp.enable_support()
+        try:
+            return backtrack([])
+        except SearchLimitReached:
+            csp.restore(start)
+            return None
+
+
+    def backjump_solver(self) -> List[Tuple[str, str]]:
+        """
+        Iterative search with forward checking and conflict-directed backjumping (FC-CBJ).
+
+        The search keeps an explicit stack of frames instead of recursing, so its depth is not bounded by the
+        recursion limit. Every frame holds a conflict set: the depths of the earlier assignments that removed
+        values from its variable's domain, either directly through a border or by wiping out the domain of a
+        neighbor. When a variable runs out of values the search jumps back to the deepest assignment of its
+        conflict set, skipping the assignments in between that took no part in the failure.
+
+        Forward checking is always used; arc consistency, when enabled, is only applied before the search.
+
+        Returns:
+            List[Tuple[str, str]]: A list of variable-value assignments that satisfy all constraints, or None if
+                                   the CSP has no solution or the search was stopped (see `limit_reached`). When
+                                   arc consistency wipes out a domain or the search is stopped, the domains are
+                                   restored as they were before the call, arc consistency prunings included.
+        """
+        csp = self.csp
+        countries = csp.countries
+        colors = csp.domain
+        values = csp.values
+
+        start = csp.checkpoint()
+        if self.AC_3 and self.apply_AC3() is None:
+            self.wipeouts += 1
+            csp.restore(start)
+            return None
+        queue = self.variable_queue = DSaturQueue(csp) if self.dsatur else None
+        if self.domain_heuristic and csp.support is None:
+            csp.enable_support()
+        static = queue is None and not self.variable_heuristic
+        unassigned = [var for var in range(len(countries)) if values[var] < 0]
+        if self.random is not None:
+            self.random.shuffle(unassigned)
+
+        pruned_by = [[] for _ in countries]  # depths of the assignments that pruned each variable
+        stack = []  # frames: [variable, trail mark, ordered values, next value position, conflict set, pruned variables]
+
+        def open_frame():
+            var = unassigned[len(stack)] if static else self.select_unassigned_variable()
+            self.count_node()
+            return [var, csp.checkpoint(), self.ordered_domain_value(var), 0, set(pruned_by[var]), []]
+
+        def undo_prunings(frame):
+            for var in frame[5]:
+                pruned_by[var].pop()
+            frame[5].clear()
+
+        def search():
+            frame = open_frame()
+            while frame is not None:
+                var, mark, ordered, position, conflicts, pruned = frame
+                depth = len(stack)
+                while position < len(ordered):
+                    value = ordered[position]
+                    position += 1
+                    if not csp.assign_index(var, value):
+                        continue
+                    if queue is not None:
+                        queue.assigned(var)
+                    wiped = self.forward_check_conflicts(var, depth, pruned, pruned_by)
+                    if wiped < 0:
+                        break
+                    self.wipeouts += 1
+                    conflicts.update(pruned_by[wiped])
+                    undo_prunings(frame)
+                    if queue is not None:
+                        queue.unassigned(var, value)
+                    csp.restore(mark)
+                else:
+                    # every value failed: jump back to the deepest assignment responsible for it
+                    self.backtracks += 1
+                    if self.instrumentation is not None:
+                        self.instrumentation.backtracked(var)
+                    conflicts.discard(depth)
+                    if not conflicts:
+                        return None
+                    target = max(conflicts)
+                    while len(stack) > target:
+                        popped = stack.pop()
+                        undo_prunings(popped)
+                        color = values[popped[0]]
+                        # restore first, so that the queue sees the deeper variables as unassigned again
+                        csp.restore(popped[1])
+                        if queue is not None:
+                            queue.unassigned(popped[0], color)
+                    frame = popped
+                    conflicts.discard(target)
+                    frame[4].update(conflicts)
+                    continue
+
+                frame[3] = position
+                stack.append(frame)
+                if csp.is_complete():
+                    return [(countries[f[0]], colors[values[f[0]]]) for f in stack]
+                frame = open_frame()
+            return None
+
+        try:
+            return search() if unassigned else []
+        except SearchLimitReached:
+            csp.restore(start)
+            return None
+
+    def iter_solutions(self, symmetry_breaking: bool = True) -> Iterator[List[Tuple[str, str]]]:
+        """
+        Enumerates the colorings of the CSP lazily, with the variable ordering, value ordering and propagation of
+        the solver. The search is iterative, so its depth is not bounded by the recursion limit, and only the
+        current branch is held in memory.
+
+        With symmetry breaking, colorings that only differ by a permutation of the colors are yielded once: a
+        variable may only take a color already used on its branch or the first unused one (value precedence),
+        so the first variable always gets the first color. It only applies when every variable is unassigned
+        and has the full domain, since otherwise the colors are not interchangeable.
+
+        The CSP is restored when the generator is exhausted or closed.
+
+        Args:
+            symmetry_breaking (bool, optional): Flag indicating whether to yield one coloring per class of color
+                                                permutations. Defaults to True.
+
+        Yields:
+            List[Tuple[str, str]]: The assignments of the variables that were unassigned, in index order.
+        """
+        csp = self.csp
+        countries = csp.countries
+        colors = csp.domain
+        values = csp.values
+        symmetric = symmetry_breaking and csp.assigned_count == 0 and all(
+            domain == csp.full_domain for domain in csp.domains)
+        unassigned = [var for var in range(len(countries)) if values[var] < 0]
+
+        start = csp.checkpoint()
+        if self.AC_3 and self.apply_AC3() is None:
+            self.wipeouts += 1
+            csp.restore(start)
+            return
+        queue = self.variable_queue = DSaturQueue(csp) if self.dsatur else None
+        if self.domain_heuristic and csp.support is None:
+            csp.enable_support()
+
+        def open_frame(used):
+            self.count_node()
+            var = self.select_unassigned_variable()
+            options = self.ordered_domain_value(var)
+            if symmetric:
+                options = [value for value in options if value <= used]
+            return [var, csp.checkpoint(), options, 0, used]
+
+        def undo(frame):
+            color = values[frame[0]]
+            csp.restore(frame[1])
+            if queue is not None:
+                queue.unassigned(frame[0], color)
+
+        stack = []  # frames: [variable, trail mark, ordered values, next value position, colors used before it]
+        try:
+            if not unassigned:
+                yield []
+                return
+            frame = open_frame(0)
+            while frame is not None:
+                var, mark, options, position, used = frame
+                while position < len(options):
+                    value = options[position]
+                    position += 1
+                    if not csp.assign_index(var, value):
+                        continue
+                    if queue is not None:
+                        queue.assigned(var)
+                    if self.propagate(var):
+                        break
+                    self.wipeouts += 1
+                    if queue is not None:
+                        queue.unassigned(var, value)
+                    csp.restore(mark)
+                else:
+                    self.backtracks += 1
+                    if self.instrumentation is not None:
+                        self.instrumentation.backtracked(var)
+                    frame = stack.pop() if stack else None
+                    if frame is not None:
+                        undo(frame)
+                    continue
+
+                frame[3] = position
+                if csp.is_complete():
+                    yield [(countries[v], colors[values[v]]) for v in unassigned]
+                    undo(frame)
+                    continue
+                stack.append(frame)
+                frame = open_frame(max(used, value + 1))
+        except SearchLimitReached:
+            pass
+        finally:
+            csp.restore(start)
+
+    def count_solutions(self, cache_size: int = 1000000) -> Optional[int]:
+        """
+        Counts the colorings of the CSP, i.e. the completions of its current assignments, without enumerating
+        them one by one.
+
+        The unassigned variables are split into connected components whose counts multiply; every component is
+        counted by branching on its variable with the fewest values (most neighbors first), with forward
+        checking, and split again after every assignment. The count of a component only depends on its
+        variables and their domains, so it is cached under them. Colors that lie in the domains of exactly the
+        same variables of a component are interchangeable there, so the branch of only one of them is counted
+        and multiplied: on a component with full domains the first variable is counted with one color for all.
+
+        Args:
+            cache_size (int, optional): The number of cached component counts after which the cache is cleared,
+                                        to bound its memory. Defaults to 1000000.
+
+        Returns:
+            int: The number of colorings, or None if the search was stopped (see `limit_reached`).
+        """
+        csp = self.csp
+        values = csp.values
+        domains = csp.domains
+        neighbors = csp.neighbors
+        mask_values = csp.mask_values
+        cache = {}
+
+        def components(variables):
+            inside = set(variables)
+            parts = []
+            for root in variables:
+                if root not in inside:
+                    continue
+                inside.discard(root)
+                part = [root]
+                for var in part:
+                    for neighbor in neighbors[var]:
+                        if neighbor in inside:
+                            inside.discard(neighbor)
+                            part.append(neighbor)
+                parts.append(part)
+            return parts
+
+        def count(part):
+            if len(part) == 1:
+                return len(mask_values[domains[part[0]]])
+            part.sort()
+            key = (tuple(part), tuple(domains[var] for var in part))
+            total = cache.get(key)
+            if total is not None:
+                return total
+            self.count_node()
+
+            var = min(part, key=lambda v: (len(mask_values[domains[v]]), -len(neighbors[v])))
+            signatures = {}  # the variables of the part whose domain holds a color -> the colors of the var
+            for value in mask_values[domains[var]]:
+                bit = 1 << value
+                signature = tuple(v for v in part if domains[v] & bit)
+                signatures.setdefault(signature, []).append(value)
+
+            rest = [v for v in part if v != var]
+            total = 0
+            mark = csp.checkpoint()
+            for interchangeable in signatures.values():
+                value = interchangeable[0]
+                if csp.assign_index(var, value) and self.forward_check(var):
+                    product = 1
+                    for sub in components(rest):
+                        product *= count(sub)
+                        if not product:
+                            break
+                    total += product * len(interchangeable)
+                else:
+                    self.wipeouts += 1
+                csp.restore(mark)
+            if len(cache) >= cache_size:
+                cache.clear()
+            cache[key] = total
+            return total
+
+        start = csp.checkpoint()
+        try:
+            # the domains must exclude the colors of assigned neighbors for the signatures to be exact
+            if not all(self.forward_check(var) for var in range(len(values)) if values[var] >= 0):
+                return 0
+            total = 1
+            for part in components([var for var in range(len(values)) if values[var] < 0]):
+                total *= count(part)
+                if not total:
+                    break
+            return total
+        except SearchLimitReached:
+            return None
+        finally:
+            csp.restore(start)
+
+    def min_conflicts_solver(self, max_steps: Optional[int] = None, time_limit: Optional[float] = None,
+                             tabu_tenure: int = 10, fallback: bool = True) -> List[Tuple[str, str]]:
+        """
+        Local search with the min-conflicts heuristic and a tabu list, for maps too large for systematic search.
+
+        Every unassigned variable first gets, in breadth-first order, its preferred color (see `preferred`) when no
+        colored neighbor holds it, otherwise the color of its domain shared by the fewest colored neighbors. Then,
+        while some variable conflicts with a neighbor, a random conflicted variable is moved to the color of its
+        domain that the fewest of its neighbors hold, ties broken randomly. A variable may not return to a color it
+        just left for `tabu_tenure` steps plus a share of the number of conflicted variables, unless the move reaches
+        fewer conflicts than ever before.
+
+        For every variable and color the number of neighbors holding the color is updated on every move, and the
+        conflicted variables are kept in a list with their positions, so a step costs the degree of the moved
+        variable and a random conflicted variable is picked in constant time. Variables that are already assigned
+        keep their values.
+
+        Args:
+            max_steps (int, optional): The number of moves after which the local search gives up. Defaults to 100
+                                       per variable, since a map that has a coloring is usually colored in a
+                                       few moves per variable and one that has none would be searched forever.
+            time_limit (float, optional): The time in seconds after which the local search gives up. Defaults
+                                          to None.
+            tabu_tenure (int, optional): The base number of steps a variable may not return to a color it left;
+                                         0 gives plain min-conflicts. Defaults to 10.
+            fallback (bool, optional): Flag indicating whether to run `backjump_solver` when the local search gives
+                                       up, trying the colors it reached first. Defaults to True.
+
+        Returns:
+            List[Tuple[str, str]]: The assignments of the variables that were unassigned, in index order, or None
+                                   if no coloring was found (see `limit_reached`).
+        """
+        csp = self.csp
+        countries = csp.countries
+        colors = csp.domain
+        neighbors = csp.neighbors
+        domains = csp.domains
+        values = csp.values
+        mask_values = csp.mask_values
+        rnd = self.random if self.random is not None else random.Random(0)
+        n = len(countries)
+        k = len(colors)
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        if max_steps is None:
+            max_steps = 100 * n
+
+        color = list(values)
+        counts = [0] * (n * k)  # counts[var * k + c]: the number of neighbors of var colored c
+        for var in range(n):
+            if color[var] >= 0:
+                for neighbor in neighbors[var]:
+                    counts[neighbor * k + color[var]] += 1
+
+        # greedy start in breadth-first order, so that every variable sees colored neighbors
+        preferred = self.preferred
+        seen = [value >= 0 for value in values]
+        movable = []
+        for root in range(n):
+            if seen[root]:
+                continue
+            seen[root] = True
+            queue = [root]
+            for var in queue:
+                options = mask_values[domains[var]]
+                if not options:
+                    return None
+                base = var * k
+                best = preferred[var] if preferred is not None else -1
+                if best < 0 or not domains[var] >> best & 1 or counts[base + best]:
+                    best = min(options, key=lambda c: counts[base + c])
+                color[var] = best
+                for neighbor in neighbors[var]:
+                    counts[neighbor * k + best] += 1
+                    if not seen[neighbor]:
+                        seen[neighbor] = True
+                        queue.append(neighbor)
+            movable.extend(queue)
+
+        conflicted = []
+        position = [-1] * n
+        total = 0  # twice the number of conflicting borders
+        for var in movable:
+            if counts[var * k + color[var]]:
+                position[var] = len(conflicted)
+                conflicted.append(var)
+        for var in range(n):
+            total += counts[var * k + color[var]] if color[var] >= 0 else 0
+        best_total = total
+
+        tabu = [0] * (n * k)  # tabu[var * k + c]: the step until which var may not take color c
+        step = 0
+        stopped = False
+        while conflicted:
+            if step >= max_steps or (not step & 1023 and (
+                    (deadline is not None and time.perf_counter() > deadline)
+                    or (self.stop is not None and self.stop()))):
+                stopped = True
+                break
+            step += 1
+            var = conflicted[rnd.randrange(len(conflicted))]
+            base = var * k
+            current = color[var]
+            leave = counts[base + current]
+            chosen = -1
+            chosen_count = n
+            ties = 0
+            for c in mask_values[domains[var]]:
+                if c == current:
+                    continue
+                count = counts[base + c]
+                if tabu[base + c] > step and total + 2 * (count - leave) >= best_total:
+                    continue
+                if count < chosen_count:
+                    chosen, chosen_count, ties = c, count, 1
+                elif count == chosen_count:
+                    ties += 1
+                    if not rnd.randrange(ties):
+                        chosen = c
+            if chosen < 0:
+                continue
+
+            if tabu_tenure:
+                tabu[base + current] = step + rnd.randrange(tabu_tenure) + (6 * len(conflicted)) // 10 + 1
+            total += 2 * (chosen_count - leave)
+            color[var] = chosen
+            for neighbor in neighbors[var]:
+                offset = neighbor * k
+                counts[offset + current] -= 1
+                counts[offset + chosen] += 1
+                if values[neighbor] >= 0:
+                    continue
+                if color[neighbor] == current and not counts[offset + current]:
+                    p = position[neighbor]
+                    last = conflicted.pop()
+                    if last != neighbor:
+                        conflicted[p] = last
+                        position[last] = p
+                    position[neighbor] = -1
+                elif color[neighbor] == chosen and counts[offset + chosen] == 1:
+                    position[neighbor] = len(conflicted)
+                    conflicted.append(neighbor)
+            if not chosen_count:
+                p = position[var]
+                last = conflicted.pop()
+                if last != var:
+                    conflicted[p] = last
+                    position[last] = p
+                position[var] = -1
+            if total < best_total:
+                best_total = total
+
+        self.nodes += step
+        csp.assignments_number += step
+        if stopped:
+            if not fallback:
+                self.limit_reached = True
+                return None
+            self.preferred = color
+            result = self.backjump_solver()
+            self.preferred = preferred
+            return None if result is None else sorted(result, key=lambda assignment: csp.index[assignment[0]])
+
+        movable.sort()
+        for var in movable:
+            csp.assign_index(var, color[var])
+        return [(countries[var], colors[color[var]]) for var in movable]
+
+    def forward_check_conflicts(self, variable: int, depth: int, pruned: List[int], pruned_by: List[List[int]]) -> int:
+        """
+        Forward checking for the backjumping search: removes the value of an assigned variable from the domains
+        of its unassigned neighbors and records that the assignment at `depth` pruned them.
 
-                    self.csp.unassign(self.csp.domain, var)
-            return None  
+        Args:
+            variable (int): The index of the assigned variable.
+            depth (int): The depth of the assignment in the search stack.
+            pruned (List[int]): Receives the indices of the pruned neighbors.
+            pruned_by (List[List[int]]): For every variable, the depths of the assignments that pruned it.
 
-        return backtrack([])
+        Returns:
+            int: The index of a neighbor whose domain became empty, or -1.
+        """
+        csp = self.csp
+        values = csp.values
+        domains = csp.domains
+        bit = 1 << values[variable]
+        for neighbor in csp.neighbors[variable]:
+            if values[neighbor] < 0 and domains[neighbor] & bit:
+                pruned.append(neighbor)
+                pruned_by[neighbor].append(depth)
+                if not csp.prune(neighbor, bit):
+                    return neighbor
+        return -1
+
+
+    def propagate(self, variable: int) -> bool:
+        """
+        Propagates the assignment of a variable according to the selected propagation mode. Every removed value
+        is recorded on the trail of the CSP, so restoring the checkpoint taken before the assignment undoes it.
+
+        Args:
+            variable (int): The index of the variable that has just been assigned.
 
+        Returns:
+            bool: False if the domain of some variable became empty, True otherwise.
+        """
+        if self.AC_3:
+            return self.maintain_arc_consistency(variable)
+        if self.forward_checking:
+            return self.forward_check(variable)
+        return True
 
-    def select_unassigned_variable(self) -> str:
+    def forward_check(self, variable: int) -> bool:
         """
-        Selects an unassigned variable using the MRV heuristic.
+        Removes the value of an assigned variable from the domains of its unassigned neighbors.
+
+        Args:
+            variable (int): The index of the assigned variable.
 
         Returns:
-            str: The selected unassigned variable.
+            bool: False if the domain of a neighbor became empty, True otherwise.
         """
+        csp = self.csp
+        values = csp.values
+        domains = csp.domains
+        bit = 1 << values[variable]
+        for neighbor in csp.neighbors[variable]:
+            if values[neighbor] < 0 and domains[neighbor] & bit:
+                if not csp.prune(neighbor, bit):
+                    return False
+        return True
+
+    def maintain_arc_consistency(self, variable: int) -> bool:
+        """
+        Incremental AC-3 after the assignment of a variable. The worklist starts with the arcs pointing to the
+        assigned variable and only grows with the arcs of variables whose domain was reduced.
+
+        For the "different colors" constraint, revising the arc (x, y) only removes a value from x when the
+        domain of y is a single value, so only the arcs of variables reduced to one value are queued.
+
+        Args:
+            variable (int): The index of the assigned variable.
+
+        Returns:
+            bool: False if the domain of some variable became empty, True otherwise.
+        """
+        csp = self.csp
+        domains = csp.domains
+        neighbors = csp.neighbors
+        mask_values = csp.mask_values
+        queue = deque((xk, variable) for xk in neighbors[variable])
+        queued = len(queue)  # revisions are counted once per call: the queued arcs minus those left over
+
+        while queue:
+            xi, xj = queue.popleft()
+            singleton = domains[xj]
+            if not domains[xi] & singleton:
+                continue
+            if not csp.prune(xi, singleton):
+                self.arc_revisions += queued - len(queue)
+                return False
+            if len(mask_values[domains[xi]]) == 1:
+                for xk in neighbors[xi]:
+                    if xk != xj:
+                        queue.append((xk, xi))
+                        queued += 1
+        self.arc_revisions += queued
+        return True
+
+    def select_unassigned_variable(self) -> Optional[int]:
+        """
+        Selects an unassigned variable using the DSatur or the MRV heuristic.
+
+        Returns:
+            int: The index of the selected unassigned variable, or None with DSatur or MRV when every variable is
+                 assigned.
+        """
+        if self.variable_queue is not None:
+            return self.variable_queue.select()
         if self.variable_heuristic:
             return self.MRV()
-        return self.csp.unassigned_var[0]
+        return self.csp.values.index(-1)
 
-    def ordered_domain_value(self, variable: str) -> List[str]:
+    def ordered_domain_value(self, variable: int) -> Tuple[int, ...]:
         """
-        Returns a list of domain values for the given variable in a specific order.
+        Returns the domain values for the given variable in a specific order.
 
         Args:
-            variable (str): The name of the variable.
+            variable (int): The index of the variable.
 
         Returns:
-            List[str]: A list of domain values for the variable in a specific order.
+            Tuple[int, ...]: The indices of the colors in the domain of the variable in a specific order.
         """
         # Function implementation goes here
-        if self.domain_heuristic:
-            return self.LCV(variable)
-        return self.csp.variables[variable]
-
-        
-
-    def arc_reduce(self, x, y, consistent) -> List[str]:
+        if self.random is not None:
+            values = list(self.csp.mask_values[self.csp.domains[variable]])
+            self.random.shuffle(values)
+            if self.domain_heuristic:
+                support = self.csp.support
+                offset = variable * len(self.csp.domain)
+                values.sort(key=lambda value: support[offset + value])
+        elif self.domain_heuristic:
+            values = self.LCV(variable)
+        else:
+            values = self.csp.mask_values[self.csp.domains[variable]]
+        if self.preferred is not None:
+            preferred = self.preferred[variable]
+            if preferred >= 0 and self.csp.domains[variable] >> preferred & 1:
+                values = [preferred, *(value for value in values if value != preferred)]
+        return values
+
+
+
+    def arc_reduce(self, x: int, y: int, consistent: Callable) -> Optional[int]:
         """
         Reduce the domain of variable x based on the constraints between x and y.
 
         Parameters:
-        - x: The first variable.
-        - y: The second variable.
+        - x: The index of the first variable.
+        - y: The index of the second variable.
         - consistent: A function that checks the consistency between two values.
 
         Returns:
-        - The reduced domain of variable x if the domain is reduced, None otherwise.
+        - The reduced domain bitmask of variable x if the domain is reduced, None otherwise.
         """
         "*** YOUR CODE HERE ***"
-        domain_reduced = False
-        domain_x = self.csp.variables[x]
-        domain_y = self.csp.variables[y]
-
-        revised = False
+        csp = self.csp
+        self.arc_revisions += 1
+        domain_y = csp.mask_values[csp.domains[y]]
 
-        for value_x in domain_x:
-            consistent_with_y = any(consistent(value_x, value_y) for value_y in domain_y)
-            if not consistent_with_y:
-                self.csp.variables[x].remove(value_x)
-                domain_reduced = True
-                revised = True
+        removed = 0
+        for value_x in csp.mask_values[csp.domains[x]]:
+            if not any(consistent(value_x, value_y) for value_y in domain_y):
+                removed |= 1 << value_x
 
-        if revised:
-            if not domain_x: 
-                return None #We have no solution
+        if not removed:
+            return None
+        csp.prune(x, removed)
+        return csp.domains[x]
 
-        return domain_x if domain_reduced else None
 
-
-    def apply_AC3(self) -> List[Tuple[str, str]]:
+    def apply_AC3(self) -> Optional[List[Tuple[int, int]]]:
         """
         Applies the AC3 algorithm to reduce the domains of variables in the CSP.
 
         Returns:
-            A list of tuples representing the removed values from the domain of variables.
+            A list of the arcs (xi, xj) that reduced the domain of xi, or None if a domain became empty. The
+            removed values are recorded on the trail of the CSP.
         """
         "*** YOUR CODE HERE ***"
+        csp = self.csp
         removed_values = []
-        queue = deque([(xi, xj) for xi in self.csp.variables for xj in self.csp.var_constraints[xi]])   #Get all arcs in a queue
+        queue = deque((xi, xj) for xi in range(len(csp.countries)) for xj in csp.neighbors[xi])   #Get all arcs in a queue
 
         while queue:
             xi, xj = queue.popleft()
-            if self.arc_reduce(xi, xj, self.csp.constraint_func):
-                if not self.csp.variables[xi]:
+            if self.arc_reduce(xi, xj, csp.constraint_func) is not None:
+                if not csp.domains[xi]:
                     return None  # Domain is empty so no solution
-                for xk in self.csp.var_constraints[xi]:   #To check other variables(xk) which are neighbors of xi that xi and it's neighbors are still consistent due to the reduction domain of xi and to see if we need any further domain reduction. 
+                for xk in csp.neighbors[xi]:   #To check other variables(xk) which are neighbors of xi that xi and it's neighbors are still consistent due to the reduction domain of xi and to see if we need any further domain reduction. 
                     if xk != xj:                            #We do not wann check xj again
                         queue.append((xk, xi))          #In order to check we add them to our queue
                 removed_values.append((xi, xj))
 
         return removed_values
-        
 
-    def MRV(self) -> str:
+
+    def MRV(self) -> Optional[int]:
         """
         Selects the variable with the Minimum Remaining Values (MRV) heuristic.
 
         Returns:
-            str: The variable with the fewest remaining values.
+            int: The index of the unassigned variable with the fewest remaining values, or None if every variable
+                 is assigned.
         """
         "*** YOUR CODE HERE ***"
+        csp = self.csp
+        mask_values = csp.mask_values
         min_remaining_values = 1000
         selected_variable = None
 
-        for variable in self.csp.unassigned_var:
-            remaining_values = len(self.csp.variables[variable])
-            if(remaining_values <= min_remaining_values):
+        for variable, value in enumerate(csp.values):
+            if value >= 0:
+                continue
+            remaining_values = len(mask_values[csp.domains[variable]])
+            if(remaining_values < min_remaining_values):
                 min_remaining_values = remaining_values
                 selected_variable = variable
-        
+
         return selected_variable
 
 
 
-    def LCV(self, variable: str) -> List[str]:
+    def LCV(self, variable: int) -> List[int]:
         """
         Orders the values of a variable based on the Least Constraining Value (LCV) heuristic.
 
+        The number of constraints a value imposes is read from the support table of the CSP, which counts for
+        every variable and color how many unassigned neighbors still hold the color.
+
         Args:
-            variable (str): The variable for which to order the values.
+            variable (int): The index of the variable for which to order the values.
 
         Returns:
-            List[str]: A list of values sorted based on the number of constraints they impose.
+            List[int]: The color indices sorted based on the number of constraints they impose.
         """
         "*** YOUR CODE HERE ***"
-        constraints_count = {value: 0 for value in self.csp.variables[variable]} #their key are the variables values and their values are their constraints count
-
-
-        for value in self.csp.variables[variable]:
-            for neighbor in self.csp.var_constraints[variable]:
-                if value in self.csp.variables[neighbor]:
-                    constraints_count[value] += 1
+        csp = self.csp
+        support = csp.support
+        offset = variable * len(csp.domain)
 
         # a sorted list of values of variable sorted based on the count of their constraints
-        sorted_values = sorted(constraints_count, key=lambda x: constraints_count[x])
+        sorted_values = sorted(csp.mask_values[csp.domains[variable]], key=lambda value: support[offset + value])
 
         return sorted_values
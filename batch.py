@@ -0,0 +1,326 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from CSP import palette
+from graph_index import GraphIndex, load_graph_index, power_adjacency
+from portfolio import run_configuration
+from solve_cache import SolveCache
+
+CONTINENTS = ["Asia", "Africa", "America", "Europe"]
+
+# job flag -> keyword argument of the solver configuration, see `portfolio.run_configuration`
+FLAGS = {
+    "lcv": "domain_heuristics",
+    "mrv": "variable_heuristics",
+    "dsatur": "dsatur",
+    "ac3": "AC_3",
+    "fc": "forward_checking",
+    "cbj": "backjumping",
+    "mc": "local_search",
+}
+
+
+def adjacency_from_borders(borders: Dict[str, List[str]]) -> Tuple[List[str], array, array]:
+    """
+    Builds the CSR adjacency of a map given as a dictionary of borders. Neighbors that are not keys of the
+    dictionary are ignored and the border relation is made symmetric.
+
+    Args:
+        borders (Dict[str, List[str]]): For every country, the list of its neighboring countries.
+
+    Returns:
+        Tuple[List[str], array, array]: The countries, and the CSR `indptr` and `indices` arrays of their adjacency.
+    """
+    countries = list(borders)
+    index = {country: i for i, country in enumerate(countries)}
+    adjacency = [set() for _ in countries]
+    for country, neighbors in borders.items():
+        for neighbor in neighbors:
+            j = index.get(neighbor)
+            if j is not None and j != index[country]:
+                adjacency[index[country]].add(j)
+                adjacency[j].add(index[country])
+    indptr = array("i", [0])
+    indices = array("i")
+    for adj in adjacency:
+        indices.extend(sorted(adj))
+        indptr.append(len(indices))
+    return countries, indptr, indices
+
+
+class MapLoader(object):
+    """
+    Loads the maps of batch jobs, sharing one adjacency index and caching every (map, distance) pair.
+    """
+
+    def __init__(self, graph: Optional[GraphIndex] = None) -> None:
+        self._graph = graph
+        self._maps = {}
+
+    @property
+    def graph(self) -> GraphIndex:
+        if self._graph is None:
+            self._graph = load_graph_index()
+        return self._graph
+
+    def load(self, job: Dict) -> Tuple[List[str], array, array]:
+        """
+        Returns the countries and the CSR adjacency of the map of a job: the continent named by its "map" key or
+        the JSON border file at its "borders" key, at its "ND" neighborhood distance.
+
+        Raises:
+            KeyError: If the dataset has no countries in the continent of the job.
+            OSError: If the border file cannot be read.
+        """
+        distance = job.get("ND", 1)
+        key = (job.get("map"), job.get("borders"), distance)
+        if key not in self._maps:
+            if job.get("borders"):
+                with open(job["borders"]) as f:
+                    countries, indptr, indices = adjacency_from_borders(json.load(f))
+                if distance > 1:
+                    indptr, indices = power_adjacency(indptr, indices, distance)
+            else:
+                countries, indptr, indices = self.graph.continent(job["map"], distance=distance)
+                if not countries:
+                    raise KeyError(f"no continent {job['map']!r} in the dataset")
+            self._maps[key] = (countries, indptr, indices)
+        return self._maps[key]
+
+
+def job_config(job: Dict) -> Dict:
+    """
+    Returns the solver configuration of a job from its boolean flags (see FLAGS) and its number of `colors`.
+
+    Raises:
+        ValueError: If the "ND" or the "colors" of the job is not a positive integer.
+    """
+    for name in ("ND", "colors"):
+        value = job.get(name)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+            raise ValueError(f"{name!r} must be a positive integer, not {value!r}")
+    config = {argument: True for flag, argument in FLAGS.items() if job.get(flag)}
+    if job.get("colors"):
+        config["colors"] = palette(job["colors"])
+    return config
+
+
+def sweep_jobs(distances: Iterable[int] = (1,)) -> Iterator[Dict]:
+    """
+    Generates one job per continent, neighborhood distance and combination of variable ordering, value ordering
+    and propagation, plus one min-conflicts job.
+    """
+    for continent, distance in itertools.product(CONTINENTS, distances):
+        for variable, lcv, propagation, cbj in itertools.product((None, "mrv", "dsatur"), (False, True),
+                                                                  (None, "fc", "ac3"), (False, True)):
+            if variable != "dsatur" and propagation is None and not cbj:
+                continue  # without propagation only DSatur orders the search well enough to finish everywhere
+            job = {"map": continent, "ND": distance, "lcv": lcv, "cbj": cbj}
+            if variable:
+                job[variable] = True
+            if propagation:
+                job[propagation] = True
+            yield job
+        yield {"map": continent, "ND": distance, "mc": True, "dsatur": True}
+
+
+def run_batch(jobs: Iterable[Dict], out: TextIO, workers: Optional[int] = None,
+              loader: Optional[MapLoader] = None, render_dir: Optional[str] = None,
+              cache: Optional[SolveCache] = None) -> int:
+    """
+    Solves every job in a process pool and writes one JSON line per job to `out` as soon as it finishes.
+
+    Every result holds the job's "id" (its position in `jobs` when absent), the job itself, the "coloring"
+    (a dictionary mapping countries to colors, null if the map has no coloring), "assignments_number",
+    "nodes" and "time" in seconds, or an "error" message, e.g. for a job that is not an object, has an invalid
+    "ND" or "colors" or names a map that cannot be loaded. With `render_dir`, the coloring of a continent job is
+    also rendered to an "<id>.png" file there in a second pool as soon as it is found, and its result is written
+    once the image is done, with the "image" path (or a "render_error" message instead).
+
+    With a cache, a continent job is first looked up by its map key, which skips loading its map, and then by the
+    graph key of its map; the results found are written at once with "cached" set and the others are stored
+    under both keys when they finish (colorings and proofs that there is none, not errors). A job identical to
+    one still running waits for its result instead of being solved again.
+
+    Args:
+        jobs (Iterable[Dict]): The jobs, see `MapLoader.load` and FLAGS.
+        out (TextIO): The stream the results are written to.
+        workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        loader (MapLoader, optional): The loader of the maps. Defaults to a new loader of the bundled dataset.
+        render_dir (str, optional): The directory the colorings are rendered to. Defaults to None (no rendering).
+        cache (SolveCache, optional): The cache of the results. Defaults to None (no caching).
+
+    Returns:
+        int: The number of jobs run.
+    """
+    loader = loader if loader is not None else MapLoader()
+    count = 0
+    renders = {}  # future of a rendering -> the record written once it is done
+    if render_dir is not None:
+        from graphics import render
+
+        os.makedirs(render_dir, exist_ok=True)
+
+    def finish(job, result, cached=False):
+        record = {
+            "id": job["id"],
+            "job": job,
+            "coloring": dict(result["solution"]) if result["solution"] is not None else None,
+            "assignments_number": result["assignments"],
+            "nodes": result["nodes"],
+            "time": result["time"],
+        }
+        if cached:
+            record["cached"] = True
+        if render_dir is not None and record["coloring"] is not None and job.get("map"):
+            record["image"] = os.path.join(render_dir, f"{job['id']}.png")
+            renders[renderer.submit(render, job["map"], record["coloring"], record["assignments_number"],
+                                    record["image"])] = record
+        else:
+            _write(out, record)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            ProcessPoolExecutor(max_workers=workers) if render_dir is not None else nullcontext() as renderer:
+        futures = {}
+        pending = {}  # cache key -> future of the job that solves it, shared by the later identical jobs
+        for position, job in enumerate(jobs):
+            # a malformed job gets an error record, the others still run
+            try:
+                if not isinstance(job, dict):
+                    raise ValueError(f"a job must be a JSON object, not {job!r}")
+                job.setdefault("id", position)
+                config = job_config(job)
+                keys = []
+                if cache is not None and job.get("map") and not job.get("borders"):
+                    keys.append(cache.map_key(job["map"], job.get("ND", 1), config))
+                    if keys[0] in pending:
+                        futures[pending[keys[0]]].append((job, keys))
+                        continue
+                    cached = cache.get(keys[0])
+                    if cached is not None:
+                        finish(job, cached, cached=True)
+                        count += 1
+                        continue
+                countries, indptr, indices = loader.load(job)
+                if cache is not None:
+                    keys.append(cache.graph_key(countries, indptr, indices, config))
+                    if keys[-1] in pending:
+                        futures[pending[keys[-1]]].append((job, keys))
+                        continue
+                    cached = cache.get(keys[-1])
+                    if cached is not None:
+                        for key in keys[:-1]:
+                            cache.put(key, cached)
+                        finish(job, cached, cached=True)
+                        count += 1
+                        continue
+            except (OSError, KeyError, TypeError, ValueError) as error:
+                job_id = job.get("id", position) if isinstance(job, dict) else position
+                _write(out, {"id": job_id, "job": job, "error": repr(error)})
+                count += 1
+                continue
+            future = executor.submit(run_configuration, countries, indptr, indices, str(job["id"]), config)
+            futures[future] = [(job, keys)]
+            for key in keys:
+                pending[key] = future
+
+        running = set(futures) | set(renders)
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in renders:
+                    record = renders.pop(future)
+                    if future.exception() is not None:
+                        del record["image"]
+                        record["render_error"] = repr(future.exception())
+                    _write(out, record)
+                    continue
+                for position, (job, keys) in enumerate(futures[future]):
+                    count += 1
+                    if future.exception() is not None:
+                        _write(out, {"id": job["id"], "job": job, "error": repr(future.exception())})
+                        continue
+                    result = future.result()
+                    if cache is not None and not result["cancelled"]:
+                        entry = {name: result[name] for name in ("solution", "assignments", "nodes", "time")}
+                        for key in keys:
+                            cache.put(key, entry)
+                    finish(job, result, cached=position > 0)
+            running.update(renders)  # the renderings of the colorings just found
+    return count
+
+
+def _parse_job(line: str):
+    """
+    Parses a line of a jobs file; a line that is not JSON is returned as is, so `run_batch` reports it.
+    """
+    try:
+        return json.loads(line)
+    except ValueError:
+        return line.strip()
+
+
+def _write(out: TextIO, record: Dict) -> None:
+    out.write(json.dumps(record) + "\n")
+    out.flush()
+
+
+def main():
+    """
+    Headless batch solver.
+
+    Command-line arguments:
+    - jobs: A JSON lines file with one job per line, "-" for standard input. Every job has a "map" (continent) or
+      "borders" (path of a JSON file mapping countries to their neighbors), an optional "ND" and the boolean flags
+      "lcv", "mrv", "dsatur", "ac3", "fc" and "cbj".
+    - --sweep: Ignore the jobs file and run every continent with every configuration.
+    - -ND, --Neighborhood-distance: The neighborhood distances of the sweep. Default is 1.
+    - -o, --output: The JSON lines file the results are written to. Default is standard output.
+    - --workers: The number of worker processes. Defaults to the number of CPUs.
+    - --render: Also render the coloring of every continent job to "<id>.png" in the given directory.
+    - --cache: Cache the results in memory, so repeated jobs are solved once; the cache statistics are printed to
+      standard error at the end.
+    - --cache-dir: Also keep the cached results in the given directory, shared between runs.
+    - --cache-size: The number of results cached in memory. Default is 256.
+    """
+    parser = argparse.ArgumentParser(
+        prog="Map Coloring Batch",
+        description="Solves many map coloring jobs in a worker pool and streams JSON lines results",
+    )
+    parser.add_argument("jobs", nargs="?", default="-", help="JSON lines job file, - for standard input")
+    parser.add_argument("--sweep", action="store_true", help="Run every continent with every configuration")
+    parser.add_argument("-ND", "--Neighborhood-distance", type=int, nargs="+", default=[1],
+                        help="Neighborhood distances of the sweep")
+    parser.add_argument("-o", "--output", default=None, help="Output JSON lines file, defaults to standard output")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--render", default=None, help="Directory the colorings are rendered to as PNG files")
+    parser.add_argument("--cache", action="store_true", help="Cache the results in memory")
+    parser.add_argument("--cache-dir", default=None, help="Directory of the on-disk tier of the cache")
+    parser.add_argument("--cache-size", type=int, default=256, help="Number of results cached in memory")
+    args = parser.parse_args()
+    cache = SolveCache(args.cache_size, args.cache_dir) if args.cache or args.cache_dir else None
+
+    if args.sweep:
+        jobs = sweep_jobs(args.Neighborhood_distance)
+    else:
+        source = sys.stdin if args.jobs == "-" else open(args.jobs)
+        jobs = [_parse_job(line) for line in source if line.strip()]
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        run_batch(jobs, out, workers=args.workers, render_dir=args.render, cache=cache)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if cache is not None:
+        print(json.dumps(cache.statistics()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,450 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from CSP import CSP
+from Solver import Solver
+from graph_index import GraphIndex, load_graph_index, power_adjacency
+from synthetic import planar_map
+
+CONTINENTS = ["Asia", "Africa", "America", "Europe"]
+
+# Cold-start commands of the startup report: the bare interpreter as a reference, the solve-only entry point and
+# the import of main.py, which must not load the plotting libraries.
+STARTUP_COMMANDS = [
+    ("interpreter", ["-c", "pass"]),
+    ("solve.py", ["solve.py", "-m", "Europe", "-dsatur"]),
+    ("import main", ["-c", "import main"]),
+]
+STARTUP_BUDGET = 0.25
+
+
+def run_benchmark(make_csp: Callable[[], CSP], repeat: int = 1, backjumping: bool = False,
+                  **solver_flags) -> Dict[str, float]:
+    """
+    Solves the map built by `make_csp` `repeat` times and measures the search rate of the solver.
+
+    Args:
+        make_csp (Callable[[], CSP]): A function returning a fresh CSP of the map.
+        repeat (int, optional): The number of times the map is solved. Defaults to 1.
+        backjumping (bool, optional): Flag indicating whether to use `Solver.backjump_solver` instead of
+                                      `Solver.backtrack_solver`. Defaults to False.
+        **solver_flags: Keyword arguments forwarded to `Solver`.
+
+    Returns:
+        Dict[str, float]: The number of nodes expanded, the number of assignments, the total wall time in seconds
+                          and the node rate in nodes per second.
+    """
+    nodes = assignments = 0
+    elapsed = 0.0
+    solved = True
+    for _ in range(repeat):
+        csp = make_csp()
+        solver = Solver(csp=csp, **solver_flags)
+        start = time.perf_counter()
+        result = solver.backjump_solver() if backjumping else solver.backtrack_solver()
+        elapsed += time.perf_counter() - start
+        solved = solved and result is not None
+        nodes += solver.nodes
+        assignments += csp.assignments_number
+    return {
+        "nodes": nodes,
+        "assignments": assignments,
+        "time": elapsed,
+        "nodes_per_sec": nodes / elapsed if elapsed > 0 else float("inf"),
+        "solved": solved,
+    }
+
+
+def power_graph_report(graph: GraphIndex, max_distance: int = 4) -> List[Dict[str, float]]:
+    """
+    Measures the build time and memory of the distance-k adjacency of every continent for k = 1..max_distance.
+
+    Args:
+        graph (GraphIndex): The adjacency index of the dataset.
+        max_distance (int, optional): The largest neighborhood distance measured. Defaults to 4.
+
+    Returns:
+        List[Dict[str, float]]: For every continent and distance, the number of countries and adjacency entries,
+                                the build time in seconds, the size of the CSR arrays in bytes and the peak memory
+                                allocated while building them.
+    """
+    rows = []
+    for continent in CONTINENTS:
+        countries, indptr, indices = graph.continent(continent)
+        for distance in range(1, max_distance + 1):
+            tracemalloc.start()
+            start = time.perf_counter()
+            power_indptr, power_indices = power_adjacency(indptr, indices, distance)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            rows.append({
+                "continent": continent,
+                "distance": distance,
+                "countries": len(countries),
+                "entries": len(power_indices),
+                "time": elapsed,
+                "bytes": len(power_indptr) * power_indptr.itemsize + len(power_indices) * power_indices.itemsize,
+                "peak_bytes": peak,
+            })
+    return rows
+
+
+def render_report(graph: GraphIndex, repeat: int = 20, formats: Sequence[str] = ("png", "svg"),
+                  workers: Optional[int] = None) -> List[Dict[str, float]]:
+    """
+    Measures the headless rendering throughput of every continent: the coloring of each continent is rendered
+    `repeat` times per format, first in this process and then with `graphics.render_many` in a process pool.
+    The first rendering of a continent, which draws its base layer, is not timed.
+
+    Args:
+        graph (GraphIndex): The adjacency index of the dataset.
+        repeat (int, optional): The number of renderings per continent and format. Defaults to 20.
+        formats (Sequence[str], optional): The image formats. Defaults to PNG and SVG.
+        workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        List[Dict[str, float]]: For every continent, format and mode ("serial" or "pool"), the number of maps
+                                rendered, the wall time in seconds and the throughput in maps per second.
+    """
+    from graphics import render, render_many
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for continent in CONTINENTS:
+            countries, indptr, indices = graph.continent(continent)
+            csp = CSP.from_adjacency(countries, indptr, indices)
+            solution = dict(Solver(csp, variable_heuristics=True, forward_checking=True).backjump_solver())
+            for extension in formats:
+                paths = [os.path.join(directory, f"{continent}-{i}.{extension}") for i in range(repeat)]
+                render(continent, solution, csp.assignments_number, paths[0])
+                for mode, count in (("serial", 1), ("pool", workers)):
+                    start = time.perf_counter()
+                    render_many([(continent, solution, csp.assignments_number, path) for path in paths],
+                                workers=count)
+                    elapsed = time.perf_counter() - start
+                    rows.append({"continent": continent, "format": extension, "mode": mode, "maps": repeat,
+                                 "time": elapsed, "maps_per_sec": repeat / elapsed})
+    return rows
+
+
+def startup_report(repeat: int = 5, budget: float = STARTUP_BUDGET) -> List[Dict]:
+    """
+    Measures the cold-start time of every command of STARTUP_COMMANDS: a new interpreter is started `repeat`
+    times in the directory of this file and the fastest run is kept, which is the least disturbed by the rest of
+    the machine.
+
+    Args:
+        repeat (int, optional): The number of runs of every command. Defaults to 5.
+        budget (float, optional): The time in seconds every command but the bare interpreter must start (and, for
+                                  solve.py, solve) within. Defaults to STARTUP_BUDGET.
+
+    Returns:
+        List[Dict]: For every command, its name, its fastest wall time in seconds, its budget (None for the bare
+                    interpreter) and whether it was within the budget.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    for name, arguments in STARTUP_COMMANDS:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *arguments], cwd=directory, check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        limit = None if name == "interpreter" else budget
+        rows.append({"command": name, "time": min(times), "budget": limit,
+                     "within_budget": limit is None or min(times) <= limit})
+    return rows
+
+
+def suite_configurations() -> List[Tuple[str, Dict]]:
+    """
+    Returns every combination of the heuristics and propagation modes of `Solver`, with both search engines, as
+    (name, configuration) pairs, followed by the min-conflicts local search. A configuration holds keyword
+    arguments of `Solver` plus `backjumping` and `local_search`, see `portfolio.run_configuration`.
+    """
+    configurations = []
+    for variable, lcv, propagation, backjumping in itertools.product((None, "mrv", "dsatur"), (False, True),
+                                                                      (None, "fc", "ac3"), (False, True)):
+        config = {
+            "variable_heuristics": variable == "mrv",
+            "dsatur": variable == "dsatur",
+            "domain_heuristics": lcv,
+            "forward_checking": propagation == "fc",
+            "AC_3": propagation == "ac3",
+            "backjumping": backjumping,
+        }
+        name = "+".join(part for part in (variable, "lcv" if lcv else None, propagation,
+                                          "cbj" if backjumping else None) if part)
+        configurations.append((name or "plain", config))
+    configurations.append(("min-conflicts", {"local_search": True, "dsatur": True}))
+    return configurations
+
+
+def run_case(countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int], config: Dict,
+             time_limit: float = 10.0, memory: bool = True) -> Dict:
+    """
+    Solves one map with one configuration and measures it.
+
+    The timed run gives up after `time_limit` seconds. When `memory` is set and the map is solved, the peak memory
+    is measured by a second run under tracemalloc, so that tracing does not distort the timings.
+
+    Args:
+        countries (Sequence[str]): The countries of the map, in index order.
+        indptr (Sequence[int]): The CSR offsets of the map's adjacency.
+        indices (Sequence[int]): The CSR neighbor indices of the map's adjacency.
+        config (Dict): The configuration, see `suite_configurations`.
+        time_limit (float, optional): The time limit of the timed run in seconds. Defaults to 10.
+        memory (bool, optional): Flag indicating whether to measure the peak memory. Defaults to True.
+
+    Returns:
+        Dict: The status ("solved", "unsatisfiable", "limit" or "recursion"), the counters of
+              `Solver.statistics`, the wall time in seconds, the node rate and the peak memory in bytes (None if
+              not measured).
+    """
+    config = dict(config)
+    backjumping = config.pop("backjumping", False)
+    local_search = config.pop("local_search", False)
+
+    def solve(max_nodes=None, deadline=None):
+        csp = CSP.from_adjacency(countries, indptr, indices)
+        stop = (lambda: time.perf_counter() > deadline) if deadline is not None else None
+        solver = Solver(csp, max_nodes=max_nodes, stop=stop, **config)
+        try:
+            if local_search:
+                result = solver.min_conflicts_solver()
+            else:
+                result = solver.backjump_solver() if backjumping else solver.backtrack_solver()
+        except RecursionError:
+            return "recursion", solver, csp
+        if result is not None:
+            return "solved", solver, csp
+        return ("limit" if solver.limit_reached else "unsatisfiable"), solver, csp
+
+    start = time.perf_counter()
+    status, solver, csp = solve(deadline=start + time_limit)
+    elapsed = time.perf_counter() - start
+
+    peak = None
+    if memory and status == "solved":
+        tracemalloc.start()
+        solve()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    result = {"status": status}
+    result.update(solver.statistics())
+    result.update(time=elapsed, nodes_per_sec=solver.nodes / elapsed if elapsed > 0 else None, peak_bytes=peak)
+    return result
+
+
+def run_suite(sizes: Sequence[int] = (1000, 10000, 100000), time_limit: float = 10.0, memory: bool = True,
+              seed: int = 0, progress: Callable[[Dict], None] = None,
+              startup_budget: Optional[float] = STARTUP_BUDGET) -> Dict:
+    """
+    Runs every configuration of `suite_configurations` on the four continents and on synthetic planar maps, and
+    measures the cold start of the entry points (see `startup_report`).
+
+    Args:
+        sizes (Sequence[int], optional): The number of regions of the synthetic maps.
+        time_limit (float, optional): The time limit of every run in seconds. Defaults to 10.
+        memory (bool, optional): Flag indicating whether to measure peak memory. Defaults to True.
+        seed (int, optional): The seed of the synthetic maps. Defaults to 0.
+        progress (Callable[[Dict], None], optional): Called with every result as soon as it is measured.
+        startup_budget (float, optional): The cold-start budget in seconds, None to skip the startup report.
+                                          Defaults to STARTUP_BUDGET.
+
+    Returns:
+        Dict: The environment of the run ("meta"), one entry per map and configuration ("results") and one entry
+              per cold-start command ("startup").
+    """
+    graph = load_graph_index()
+    maps = [(continent, graph.continent(continent)) for continent in CONTINENTS]
+    maps += [(f"planar-{size}", planar_map(size, seed=seed)) for size in sizes]
+
+    results = []
+    for (map_name, (countries, indptr, indices)), (config_name, config) in itertools.product(
+            maps, suite_configurations()):
+        result = {"map": map_name, "regions": len(countries), "config": config_name}
+        result.update(run_case(countries, indptr, indices, config, time_limit=time_limit, memory=memory))
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "time_limit": time_limit,
+            "seed": seed,
+        },
+        "results": results,
+        "startup": startup_report(budget=startup_budget) if startup_budget is not None else [],
+    }
+
+
+def compare_results(old: Dict, new: Dict, threshold: float = 0.1, min_time: float = 0.005) -> List[str]:
+    """
+    Compares two suite runs and describes every regression of the new one: a map that is no longer solved, more
+    nodes, assignments or consistency checks, or a wall time or peak memory more than `threshold` above the old
+    one. Times below `min_time` seconds are too noisy to compare. A cold start over its budget is a regression
+    too, whatever the baseline.
+
+    Args:
+        old (Dict): The baseline run, as returned by `run_suite`.
+        new (Dict): The run to check.
+        threshold (float, optional): The tolerated relative increase of time and memory. Defaults to 0.1.
+        min_time (float, optional): The time in seconds under which time increases are ignored. Defaults to 0.005.
+
+    Returns:
+        List[str]: One description per regression.
+    """
+    baseline = {(result["map"], result["config"]): result for result in old["results"]}
+    regressions = []
+    for result in new["results"]:
+        before = baseline.get((result["map"], result["config"]))
+        if before is None:
+            continue
+        label = f"{result['map']} {result['config']}"
+        if before["status"] == "solved" and result["status"] != "solved":
+            regressions.append(f"{label}: {result['status']} (was solved)")
+            continue
+        if result["status"] != "solved" or before["status"] != "solved":
+            continue
+        for key in ("nodes", "assignments", "consistency_checks"):
+            if key in before and result[key] > before[key]:
+                regressions.append(f"{label}: {key} {before[key]} -> {result[key]}")
+        if result["time"] > max(before["time"], min_time) * (1 + threshold):
+            regressions.append(f"{label}: time {before['time']:.4f}s -> {result['time']:.4f}s")
+        if before["peak_bytes"] and result["peak_bytes"] and \
+                result["peak_bytes"] > before["peak_bytes"] * (1 + threshold):
+            regressions.append(f"{label}: peak memory {before['peak_bytes']} -> {result['peak_bytes']} bytes")
+    for row in new.get("startup", []):
+        if not row["within_budget"]:
+            regressions.append(f"startup {row['command']}: {row['time']:.3f}s over the budget of {row['budget']}s")
+    return regressions
+
+
+def main():
+    """
+    Measures the node rate of the solver on the four continents.
+
+    Command-line arguments:
+    - -r, --repeat: The number of times every continent is solved (or rendered, with --render). Default is 1
+      (20 with --render).
+    - -lcv, --lcv: Enable least constraint value (LCV) as an order-type optimizer.
+    - -mrv, --mrv: Enable minimum remaining values (MRV) as an order-type optimizer.
+    - -dsatur, --dsatur: Enable saturation degree (DSatur) variable selection instead of MRV.
+    - -ac3, --arc-consistency: Enable arc consistency.
+    - -fc, --forward-checking: Enable forward checking.
+    - -cbj, --backjumping: Use the iterative engine with conflict-directed backjumping.
+    - -ND, --Neighborhood-distance: Solve the distance-k coloring of every continent. Default is 1.
+    - --power-graph: Report the build time and memory of the distance-k adjacency for k = 1..4 instead of solving.
+    - --render: Measure the headless rendering throughput (maps per second) of every continent in PNG and SVG,
+      serially and in --workers processes.
+    - --workers: The number of worker processes of --render. Defaults to the number of CPUs.
+    - --suite: Run every configuration on the continents and on synthetic planar maps, and write the results to
+      the --output JSON file.
+    - --sizes: The number of regions of the synthetic maps of the suite. Default is 1000 10000 100000.
+    - --time-limit: The time limit of every run of the suite in seconds. Default is 10.
+    - --no-memory: Do not measure peak memory in the suite.
+    - --startup-budget: The cold-start budget of the suite in seconds (see `startup_report`). Default is 0.25.
+    - -o, --output: The JSON file the suite results are written to. Default is benchmark_results.json.
+    - --compare OLD NEW: Compare two suite result files and exit with status 1 if NEW has regressions.
+    - --threshold: The tolerated relative increase of time and memory in --compare. Default is 0.1.
+    """
+    parser = argparse.ArgumentParser(
+        prog="Map Coloring Benchmark",
+        description="Measures the node rate of the CSP solver on every continent",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=None, help="Number of solves per continent")
+    parser.add_argument("-lcv", "--lcv", action="store_true", help="Enable least constraint value (LCV)")
+    parser.add_argument("-mrv", "--mrv", action="store_true", help="Enable minimum remaining values (MRV)")
+    parser.add_argument("-dsatur", "--dsatur", action="store_true", help="Enable DSatur variable selection")
+    parser.add_argument("-ac3", "--arc-consistency", action="store_true", help="Enable arc consistency")
+    parser.add_argument("-fc", "--forward-checking", action="store_true", help="Enable forward checking")
+    parser.add_argument("-cbj", "--backjumping", action="store_true", help="Use the backjumping engine")
+    parser.add_argument("-ND", "--Neighborhood-distance", type=int, default=1, help="Neighborhood distance")
+    parser.add_argument("--power-graph", action="store_true", help="Report distance-k adjacency build cost")
+    parser.add_argument("--render", action="store_true", help="Measure the headless rendering throughput")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes of --render")
+    parser.add_argument("--suite", action="store_true", help="Run the full benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Number of regions of the synthetic maps")
+    parser.add_argument("--time-limit", type=float, default=10.0, help="Time limit of every suite run in seconds")
+    parser.add_argument("--no-memory", action="store_true", help="Do not measure peak memory")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET, help="Cold-start budget in seconds")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Suite results file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two suite results files")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Tolerated relative increase")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        regressions = compare_results(old, new, threshold=args.threshold)
+        for regression in regressions:
+            print(regression)
+        print(f"{len(regressions)} regressions")
+        sys.exit(1 if regressions else 0)
+
+    if args.suite:
+        print(f"{'map':<14}{'config':<20}{'status':>14}{'nodes':>10}{'assignments':>13}{'time (s)':>10}"
+              f"{'nodes/s':>10}{'peak bytes':>12}")
+
+        def progress(result):
+            rate = f"{result['nodes_per_sec']:.0f}" if result["nodes_per_sec"] else "-"
+            print(f"{result['map']:<14}{result['config']:<20}{result['status']:>14}{result['nodes']:>10}"
+                  f"{result['assignments']:>13}{result['time']:>10.4f}{rate:>10}{result['peak_bytes'] or '-':>12}",
+                  flush=True)
+
+        report = run_suite(sizes=args.sizes, time_limit=args.time_limit, memory=not args.no_memory,
+                           progress=progress, startup_budget=args.startup_budget)
+        print(f"{'startup':<14}{'time (s)':>10}{'budget (s)':>12}")
+        for row in report["startup"]:
+            budget = f"{row['budget']:.3f}" if row["budget"] is not None else "-"
+            status = "" if row["within_budget"] else "  over budget"
+            print(f"{row['command']:<14}{row['time']:>10.3f}{budget:>12}{status}")
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+        return
+
+    graph = load_graph_index()
+    if args.power_graph:
+        print(f"{'map':<10}{'k':>3}{'countries':>11}{'entries':>9}{'time (s)':>12}{'bytes':>9}{'peak bytes':>12}")
+        for row in power_graph_report(graph):
+            print(f"{row['continent']:<10}{row['distance']:>3}{row['countries']:>11}{row['entries']:>9}"
+                  f"{row['time']:>12.6f}{row['bytes']:>9}{row['peak_bytes']:>12}")
+        return
+
+    if args.render:
+        print(f"{'map':<10}{'format':>7}{'mode':>8}{'maps':>6}{'time (s)':>10}{'maps/s':>9}")
+        for row in render_report(graph, repeat=args.repeat or 20, workers=args.workers):
+            print(f"{row['continent']:<10}{row['format']:>7}{row['mode']:>8}{row['maps']:>6}{row['time']:>10.3f}"
+                  f"{row['maps_per_sec']:>9.2f}")
+        return
+
+    print(f"{'map':<10}{'nodes':>10}{'assignments':>14}{'time (s)':>12}{'nodes/s':>14}{'solved':>8}")
+    for continent in CONTINENTS:
+        countries, indptr, indices = graph.continent(continent, distance=args.Neighborhood_distance)
+        stats = run_benchmark(lambda: CSP.from_adjacency(countries, indptr, indices), repeat=args.repeat or 1,
+                              backjumping=args.backjumping, domain_heuristics=args.lcv,
+                              variable_heuristics=args.mrv, AC_3=args.arc_consistency,
+                              forward_checking=args.forward_checking, dsatur=args.dsatur)
+        print(f"{continent:<10}{stats['nodes']:>10}{stats['assignments']:>14}"
+              f"{stats['time']:>12.4f}{stats['nodes_per_sec']:>14.0f}{str(stats['solved']):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import heapq
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from CSP import CSP, palette
+from Solver import Solver
+
+
+def greedy_clique(indptr: Sequence[int], indices: Sequence[int]) -> List[int]:
+    """
+    Finds a large clique greedily: every node in order of decreasing degree is extended with its neighbors, the
+    ones of highest degree first, as long as they border every node of the clique. Its size is a lower bound of
+    the chromatic number.
+
+    Args:
+        indptr (Sequence[int]): The CSR offsets of the adjacency.
+        indices (Sequence[int]): The CSR neighbor indices of the adjacency.
+
+    Returns:
+        List[int]: The nodes of the largest clique found.
+    """
+    n = len(indptr) - 1
+    degree = [indptr[i + 1] - indptr[i] for i in range(n)]
+    adjacency = [set(indices[indptr[i]:indptr[i + 1]]) for i in range(n)]
+    best = [0] if n else []
+    for node in sorted(range(n), key=lambda i: -degree[i]):
+        if degree[node] < len(best):
+            break  # no clique through this node can be larger
+        clique = [node]
+        for neighbor in sorted(adjacency[node], key=lambda i: -degree[i]):
+            if degree[neighbor] >= len(best) and all(member in adjacency[neighbor] for member in clique):
+                clique.append(neighbor)
+        if len(clique) > len(best):
+            best = clique
+    return best
+
+
+def dsatur_coloring(indptr: Sequence[int], indices: Sequence[int]) -> List[int]:
+    """
+    Colors a graph greedily with DSatur and as many colors as needed: the uncolored node with the most distinct
+    colors among its neighbors, ties broken by degree, gets the lowest color none of its neighbors has. The number
+    of colors used is an upper bound of the chromatic number.
+
+    Args:
+        indptr (Sequence[int]): The CSR offsets of the adjacency.
+        indices (Sequence[int]): The CSR neighbor indices of the adjacency.
+
+    Returns:
+        List[int]: The color index of every node.
+    """
+    n = len(indptr) - 1
+    color = [-1] * n
+    neighbor_colors = [set() for _ in range(n)]
+    heap = [(0, -(indptr[i + 1] - indptr[i]), i) for i in range(n)]
+    heapq.heapify(heap)
+    while heap:
+        saturation, degree, node = heapq.heappop(heap)
+        if color[node] >= 0 or -saturation != len(neighbor_colors[node]):
+            continue  # outdated entry
+        used = neighbor_colors[node]
+        c = 0
+        while c in used:
+            c += 1
+        color[node] = c
+        for neighbor in indices[indptr[node]:indptr[node + 1]]:
+            if color[neighbor] < 0 and c not in neighbor_colors[neighbor]:
+                neighbor_colors[neighbor].add(c)
+                heapq.heappush(heap, (-len(neighbor_colors[neighbor]), -(indptr[neighbor + 1] - indptr[neighbor]),
+                                      neighbor))
+    return color
+
+
+def _relabel(color: List[int], first: Sequence[int]) -> List[int]:
+    """
+    Renumbers the colors of a coloring to 0, 1, ... without gaps, giving the colors of the nodes `first` the
+    lowest numbers in that order.
+    """
+    order = {}
+    for node in first:
+        order.setdefault(color[node], len(order))
+    for c in sorted(set(color)):
+        order.setdefault(c, len(order))
+    return [order[c] for c in color]
+
+
+def chromatic_number(countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int],
+                     time_limit: Optional[float] = None, local_search_steps: int = 5, seed: Optional[int] = None,
+                     progress: Optional[Callable[[Dict], None]] = None) -> Tuple[List[Tuple[str, str]], Dict]:
+    """
+    Searches for the fewest colors that color a map, e.g. a power graph (ND > 1) that needs more than four.
+
+    A greedy clique gives the lower bound and a DSatur coloring the upper bound. Then the map is solved for one
+    color less than the best coloring found, until a solve fails or reaches the lower bound. Solves do not start
+    cold: every country prefers its color of the previous coloring, so only the countries of the removed color
+    move (see `Solver.min_conflicts_solver`, which falls back to `Solver.backjump_solver` to prove that no
+    coloring exists), and the clique keeps the colors 0, 1, ... it got first, which rules out the colorings that
+    only permute colors. A solve that uses fewer colors than allowed skips the counts in between.
+
+    Args:
+        countries (Sequence[str]): The countries of the map, in index order.
+        indptr (Sequence[int]): The CSR offsets of the map's adjacency.
+        indices (Sequence[int]): The CSR neighbor indices of the map's adjacency.
+        time_limit (float, optional): The time in seconds after which the search stops with the best coloring
+                                      found. Defaults to None.
+        local_search_steps (int, optional): The number of local search moves per country of every solve before
+                                            it falls back to systematic search. A warm start needs few moves when
+                                            a coloring exists, while proving that none exists is left to the
+                                            systematic search. Defaults to 5.
+        seed (int, optional): The seed of the local search. Defaults to None.
+        progress (Callable[[Dict], None], optional): Called with every step as soon as it is finished.
+
+    Returns:
+        Tuple[List[Tuple[str, str]], Dict]: The best coloring found in index order, with the colors of `palette`,
+                                            and the search statistics: the lower and upper bounds, the chromatic
+                                            number (None if the time limit was reached first), the time of the
+                                            bounds and one entry per step with the number of colors `k`, its
+                                            status ("solved", "unsatisfiable" or "limit"), the number of colors
+                                            used, the nodes, the assignments and the time in seconds.
+    """
+    start = time.perf_counter()
+    deadline = start + time_limit if time_limit is not None else None
+    stop = (lambda: time.perf_counter() > deadline) if deadline is not None else None
+
+    clique = greedy_clique(indptr, indices)
+    best = _relabel(dsatur_coloring(indptr, indices), clique)
+    k = max(best) + 1 if best else 0
+    stats = {"lower_bound": len(clique), "upper_bound": k, "chromatic_number": None,
+             "bounds_time": time.perf_counter() - start, "steps": []}
+
+    while k > len(clique):
+        step_start = time.perf_counter()
+        target = k - 1
+        csp = CSP.from_adjacency(countries, indptr, indices, colors=palette(target))
+        for node in clique:
+            csp.assign_index(node, best[node])
+        preferred = [c if c < target else -1 for c in best]
+        solver = Solver(csp, dsatur=True, preferred=preferred, stop=stop, seed=seed)
+        result = solver.min_conflicts_solver(max_steps=local_search_steps * len(countries))
+
+        step = {"k": target, "status": "solved", "colors_used": None, "nodes": solver.nodes,
+                "assignments": csp.assignments_number}
+        if result is None:
+            step["status"] = "limit" if solver.limit_reached else "unsatisfiable"
+        else:
+            best = _relabel(csp.values, clique)
+            step["colors_used"] = max(best) + 1
+        step["time"] = time.perf_counter() - step_start
+        stats["steps"].append(step)
+        if progress is not None:
+            progress(step)
+        if result is None:
+            if not solver.limit_reached:
+                stats["chromatic_number"] = k
+            break
+        k = step["colors_used"]
+    else:
+        stats["chromatic_number"] = k
+
+    colors = palette(k)
+    return [(country, colors[best[i]]) for i, country in enumerate(countries)], stats
@@ -0,0 +1,193 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from CSP import DEFAULT_COLORS
+from graph_index import induced_subgraph
+from portfolio import run_configuration
+
+
+def connected_components(indptr: Sequence[int], indices: Sequence[int]) -> List[List[int]]:
+    """
+    Splits a graph into its connected components.
+
+    Args:
+        indptr (Sequence[int]): The CSR offsets of the graph.
+        indices (Sequence[int]): The CSR neighbor indices of the graph.
+
+    Returns:
+        List[List[int]]: The nodes of every component, sorted, in order of their smallest node.
+    """
+    component_of = [-1] * (len(indptr) - 1)
+    components = []
+    for root in range(len(component_of)):
+        if component_of[root] >= 0:
+            continue
+        component_of[root] = len(components)
+        component = [root]
+        for node in component:
+            for neighbor in indices[indptr[node]:indptr[node + 1]]:
+                if component_of[neighbor] < 0:
+                    component_of[neighbor] = len(components)
+                    component.append(neighbor)
+        components.append(sorted(component))
+    return components
+
+
+def biconnected_components(indptr: Sequence[int], indices: Sequence[int]) -> List[List[int]]:
+    """
+    Splits a graph into its biconnected components (blocks) with an iterative version of Tarjan's algorithm.
+    Two blocks share at most one node, an articulation point, and isolated nodes form blocks of their own.
+
+    Args:
+        indptr (Sequence[int]): The CSR offsets of the graph.
+        indices (Sequence[int]): The CSR neighbor indices of the graph.
+
+    Returns:
+        List[List[int]]: The nodes of every block, sorted.
+    """
+    size = len(indptr) - 1
+    discovery = [-1] * size
+    low = [0] * size
+    blocks = []
+    counter = 0
+    for root in range(size):
+        if discovery[root] >= 0:
+            continue
+        discovery[root] = low[root] = counter
+        counter += 1
+        if indptr[root] == indptr[root + 1]:
+            blocks.append([root])
+            continue
+        stack = [(root, -1, indptr[root])]  # node, parent, position of the next edge to explore
+        edges = []
+        while stack:
+            node, parent, position = stack[-1]
+            if position < indptr[node + 1]:
+                stack[-1] = (node, parent, position + 1)
+                neighbor = indices[position]
+                if discovery[neighbor] < 0:
+                    edges.append((node, neighbor))
+                    discovery[neighbor] = low[neighbor] = counter
+                    counter += 1
+                    stack.append((neighbor, node, indptr[neighbor]))
+                elif neighbor != parent and discovery[neighbor] < discovery[node]:
+                    edges.append((node, neighbor))
+                    low[node] = min(low[node], discovery[neighbor])
+                continue
+            stack.pop()
+            if not stack:
+                continue
+            above = stack[-1][0]
+            low[above] = min(low[above], low[node])
+            if low[node] >= discovery[above]:
+                block = set()
+                while True:
+                    edge = edges.pop()
+                    block.update(edge)
+                    if edge == (above, node):
+                        break
+                blocks.append(sorted(block))
+    return blocks
+
+
+def merge_blocks(blocks: List[List[int]], colorings: List[List[int]]) -> Dict[int, int]:
+    """
+    Merges independent colorings of the blocks of a graph into a coloring of the whole graph. Blocks are placed
+    along the block-cut tree: the colors of every new block are swapped so that the articulation point it shares
+    with an already placed block keeps its color, which leaves the block properly colored.
+
+    Args:
+        blocks (List[List[int]]): The nodes of every block.
+        colorings (List[List[int]]): For every block, the color index of each of its nodes.
+
+    Returns:
+        Dict[int, int]: The color index of every node.
+    """
+    blocks_of = {}
+    for b, block in enumerate(blocks):
+        for node in block:
+            blocks_of.setdefault(node, []).append(b)
+
+    color = {}
+    placed = [False] * len(blocks)
+    for root in range(len(blocks)):
+        if placed[root]:
+            continue
+        placed[root] = True
+        color.update(zip(blocks[root], colorings[root]))
+        queue = [root]
+        for b in queue:
+            for node in blocks[b]:
+                for other in blocks_of[node]:
+                    if placed[other]:
+                        continue
+                    placed[other] = True
+                    local = dict(zip(blocks[other], colorings[other]))
+                    wanted, current = color[node], local[node]
+                    for member, value in local.items():
+                        if value == current:
+                            value = wanted
+                        elif value == wanted:
+                            value = current
+                        color.setdefault(member, value)
+                    queue.append(other)
+    return color
+
+
+def solve_decomposed(countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int],
+                     config: Optional[Dict] = None, biconnected: bool = False,
+                     workers: Optional[int] = None) -> Tuple[Optional[List[Tuple[str, str]]], Dict]:
+    """
+    Solves a map by splitting it into connected components, or into biconnected blocks, and solving every
+    non-trivial part independently, optionally in a process pool. Isolated countries get the first color.
+
+    Args:
+        countries (Sequence[str]): The countries of the map, in index order.
+        indptr (Sequence[int]): The CSR offsets of the map's adjacency.
+        indices (Sequence[int]): The CSR neighbor indices of the map's adjacency.
+        config (Dict, optional): The solver configuration of every part, see `portfolio.run_configuration`.
+                                 Defaults to forward checking with MRV.
+        biconnected (bool, optional): Flag indicating whether to split the components further into blocks.
+                                      Defaults to False.
+        workers (int, optional): The number of worker processes; parts are solved in this process when None or 1.
+
+    Returns:
+        Tuple[Optional[List[Tuple[str, str]]], Dict]: The coloring of the whole map in index order (None if a
+                                                      part has no coloring), and the number of parts, isolated
+                                                      countries, assignments and nodes.
+    """
+    config = config if config is not None else dict(variable_heuristics=True, forward_checking=True)
+    parts = biconnected_components(indptr, indices) if biconnected else connected_components(indptr, indices)
+    solvable = [part for part in parts if len(part) > 1]
+    jobs = []
+    for part in solvable:
+        sub_indptr, sub_indices = induced_subgraph(indptr, indices, part)
+        jobs.append(([countries[node] for node in part], sub_indptr, sub_indices, "part", config))
+
+    if workers is not None and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_configuration, *zip(*jobs)))
+    else:
+        results = [run_configuration(*job) for job in jobs]
+
+    stats = {
+        "parts": len(solvable),
+        "isolated": len(parts) - len(solvable),
+        "assignments": sum(result["assignments"] for result in results),
+        "nodes": sum(result["nodes"] for result in results),
+    }
+    if any(result["solution"] is None for result in results):
+        return None, stats
+
+    colors = config.get("colors", DEFAULT_COLORS)
+    color_index = {color: i for i, color in enumerate(colors)}
+    solutions = iter(result["solution"] for result in results)
+    colorings = []
+    for part in parts:
+        if len(part) == 1:
+            colorings.append([0])
+            continue
+        solution = dict(next(solutions))
+        colorings.append([color_index[solution[countries[node]]] for node in part])
+    color = merge_blocks(parts, colorings)
+    return [(country, colors[color[i]]) for i, country in enumerate(countries)], stats
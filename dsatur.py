@@ -0,0 +1,92 @@
+import heapq
+from typing import Optional
+
+from CSP import CSP
+
+
+class DSaturQueue(object):
+    """
+    Indexed priority structure for DSatur variable selection.
+
+    The saturation degree of a variable is the number of distinct colors assigned to its neighbors. The next
+    variable is the unassigned one with the highest saturation, ties broken by the highest degree and then by the
+    lowest index. Saturations are updated incrementally when a variable is assigned or unassigned, and the heap
+    uses lazy deletion: outdated entries are dropped when they reach the top.
+
+    Attributes:
+        csp (CSP): The CSP whose variables are ordered.
+        degree (list): The number of neighbors of every variable.
+        color_count (list): For every variable, how many assigned neighbors have each color.
+        saturation (list): The saturation degree of every variable.
+    """
+
+    def __init__(self, csp: CSP) -> None:
+        self.csp = csp
+        size = len(csp.domain)
+        self.degree = [len(neighbors) for neighbors in csp.neighbors]
+        self.color_count = [[0] * size for _ in csp.countries]
+        self.saturation = [0] * len(csp.countries)
+        for var, color in enumerate(csp.values):
+            if color >= 0:
+                for neighbor in csp.neighbors[var]:
+                    counts = self.color_count[neighbor]
+                    counts[color] += 1
+                    if counts[color] == 1:
+                        self.saturation[neighbor] += 1
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """
+        Rebuilds the heap from the unassigned variables, discarding every outdated entry.
+        """
+        values = self.csp.values
+        self.heap = [(-self.saturation[var], -self.degree[var], var) for var in range(len(values)) if values[var] < 0]
+        heapq.heapify(self.heap)
+
+    def select(self) -> Optional[int]:
+        """
+        Returns the unassigned variable with the highest saturation degree, or None if every variable is assigned.
+        """
+        heap = self.heap
+        values = self.csp.values
+        saturation = self.saturation
+        while heap:
+            sat, _, var = heap[0]
+            if values[var] < 0 and -sat == saturation[var]:
+                return var
+            heapq.heappop(heap)
+        return None
+
+    def assigned(self, var: int) -> None:
+        """
+        Updates the saturation of the neighbors of a variable that has just been assigned.
+        """
+        color = self.csp.values[var]
+        values = self.csp.values
+        saturation = self.saturation
+        for neighbor in self.csp.neighbors[var]:
+            counts = self.color_count[neighbor]
+            counts[color] += 1
+            if counts[color] == 1:
+                saturation[neighbor] += 1
+                if values[neighbor] < 0:
+                    heapq.heappush(self.heap, (-saturation[neighbor], -self.degree[neighbor], neighbor))
+        if len(self.heap) > 4 * len(values) + 64:
+            self._rebuild()
+
+    def unassigned(self, var: int, color: int) -> None:
+        """
+        Updates the saturation of the neighbors of a variable whose assignment to `color` is being undone, and
+        puts the variable back in the queue.
+        """
+        values = self.csp.values
+        saturation = self.saturation
+        for neighbor in self.csp.neighbors[var]:
+            counts = self.color_count[neighbor]
+            counts[color] -= 1
+            if counts[color] == 0:
+                saturation[neighbor] -= 1
+                if values[neighbor] < 0:
+                    heapq.heappush(self.heap, (-saturation[neighbor], -self.degree[neighbor], neighbor))
+        heapq.heappush(self.heap, (-saturation[var], -self.degree[var], var))
+
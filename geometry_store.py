@@ -0,0 +1,131 @@
+import csv
+import os
+import pickle
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from graph_index import DATASET_PATH, dataset_digest
+
+_VERSION = 1
+
+_cache: Dict[Tuple[str, str], Tuple[bytes, "ContinentGeometry"]] = {}
+
+
+class ContinentGeometry(object):
+    """
+    The parsed geometry of the countries of a continent, ready to be drawn without shapely.
+
+    Attributes:
+        continent (str): The name of the continent.
+        isos (list): The ISO A3 code of every country, in dataset order.
+        polygons (list): For every country, its polygons; every polygon is a list of rings (the exterior first,
+                         then the holes) and every ring an array of interleaved x, y coordinates.
+        centroids (list): For every country, the (x, y) centroid of its geometry, where its label is drawn.
+    """
+
+    def __init__(self, continent: str, isos: List[str], polygons: List[List[List[array]]],
+                 centroids: List[Tuple[float, float]]) -> None:
+        self.continent = continent
+        self.isos = isos
+        self.polygons = polygons
+        self.centroids = centroids
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """
+        Tuple[float, float, float, float]: The (minx, miny, maxx, maxy) bounds of the continent.
+        """
+        exteriors = [polygon[0] for country in self.polygons for polygon in country]
+        if not exteriors:
+            return 0.0, 0.0, 0.0, 0.0
+        xs = [min(ring[0::2]) for ring in exteriors] + [max(ring[0::2]) for ring in exteriors]
+        ys = [min(ring[1::2]) for ring in exteriors] + [max(ring[1::2]) for ring in exteriors]
+        return min(xs), min(ys), max(xs), max(ys)
+
+
+def parse_continent(continent: str, path: str = DATASET_PATH) -> ContinentGeometry:
+    """
+    Parses the WKT geometries of the countries of one continent. Rows of other continents are skipped before
+    their geometry is parsed.
+
+    Args:
+        continent (str): The name of the continent.
+        path (str, optional): The path of the CSV dataset. Defaults to DATASET_PATH.
+
+    Returns:
+        ContinentGeometry: The geometry of the continent.
+    """
+    from shapely import wkt
+
+    csv.field_size_limit(max(csv.field_size_limit(), 1 << 30))
+    isos, polygons, centroids = [], [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row["continent"] != continent:
+                continue
+            geometry = wkt.loads(row["geometry"])
+            parts = geometry.geoms if geometry.geom_type == "MultiPolygon" else [geometry]
+            isos.append(row["iso_a3"])
+            polygons.append([[array("d", [c for point in ring.coords for c in point[:2]])
+                              for ring in (part.exterior, *part.interiors)] for part in parts])
+            centroids.append((geometry.centroid.x, geometry.centroid.y))
+    return ContinentGeometry(continent, isos, polygons, centroids)
+
+
+def geometry_sidecar_path(path: str = DATASET_PATH) -> str:
+    """
+    Returns the path of the file that caches the parsed geometries of a dataset.
+    """
+    return os.path.splitext(path)[0] + ".geometry"
+
+
+def load_continent_geometry(continent: str, path: str = DATASET_PATH) -> ContinentGeometry:
+    """
+    Loads the geometry of a continent from the geometry sidecar of a dataset. A continent that is not in the
+    sidecar yet, or a sidecar built from an older content of the dataset, is parsed from the CSV and written
+    back, so every continent is parsed once. Geometries are also cached per process.
+
+    Args:
+        continent (str): The name of the continent.
+        path (str, optional): The path of the CSV dataset. Defaults to DATASET_PATH.
+
+    Returns:
+        ContinentGeometry: The geometry of the continent.
+    """
+    digest = dataset_digest(path)
+    key = (os.path.abspath(path), continent)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == digest:
+        return cached[1]
+
+    sidecar = geometry_sidecar_path(path)
+    store = _read_store(sidecar)
+    if store is None or store["digest"] != digest:
+        store = {"version": _VERSION, "digest": digest, "continents": {}}
+    entry = store["continents"].get(continent)
+    if entry is not None:
+        geometry = ContinentGeometry(continent, *entry)
+    else:
+        geometry = parse_continent(continent, path)
+        store["continents"][continent] = (geometry.isos, geometry.polygons, geometry.centroids)
+        try:
+            tmp = f"{sidecar}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, sidecar)
+        except OSError:
+            pass  # read-only checkout, the continent is parsed again on the next start
+
+    _cache[key] = (digest, geometry)
+    return geometry
+
+
+def _read_store(sidecar: str) -> Optional[Dict]:
+    try:
+        with open(sidecar, "rb") as f:
+            store = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(store, dict) or store.get("version") != _VERSION:
+        return None
+    return store
@@ -0,0 +1,266 @@
+import csv
+import hashlib
+import os
+import struct
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DATASET_PATH = './countries_dataset.csv'
+
+_MAGIC = b"MCGI"
+_VERSION = 1
+# magic, version, sha1 digest of the CSV, number of countries, number of adjacency entries, size of the names block
+_HEADER = struct.Struct("<4sI20sIII")
+
+_cache: Dict[str, "GraphIndex"] = {}
+
+
+class GraphIndex(object):
+    """
+    Integer adjacency index of the countries dataset in compressed sparse row (CSR) form.
+
+    The neighbors of the country with index `i` are `indices[indptr[i]:indptr[i + 1]]`.
+
+    Attributes:
+        isos (list): The ISO A3 code of every country, in index order.
+        continents (list): The continent of every country, in index order.
+        indptr (array): The offsets of every country's neighbors in `indices`, of length `len(isos) + 1`.
+        indices (array): The concatenated neighbor indices of every country.
+        iso_to_id (dict): A dictionary that maps every ISO A3 code to its index.
+        digest (bytes): The SHA-1 digest of the CSV file the index was built from.
+    """
+
+    def __init__(self, isos: List[str], continents: List[str], indptr: array, indices: array, digest: bytes) -> None:
+        self.isos = isos
+        self.continents = continents
+        self.indptr = indptr
+        self.indices = indices
+        self.digest = digest
+        self.iso_to_id = {iso: i for i, iso in enumerate(isos)}
+
+    def neighbors(self, node: int) -> array:
+        """
+        Returns the indices of the neighbors of the country with index `node`.
+        """
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def nodes_in(self, continent: str) -> List[int]:
+        """
+        Returns the indices of the countries of a continent, in dataset order.
+        """
+        return [i for i, name in enumerate(self.continents) if name == continent]
+
+    def subgraph(self, nodes: Sequence[int]) -> Tuple[List[str], array, array]:
+        """
+        Extracts the subgraph induced by `nodes`, renumbered from 0 in the given order.
+
+        Args:
+            nodes (Sequence[int]): The indices of the countries to keep.
+
+        Returns:
+            Tuple[List[str], array, array]: The ISO A3 codes of the kept countries and the CSR `indptr` and
+                                            `indices` arrays of their adjacency. Borders with countries that are
+                                            not kept are dropped.
+        """
+        indptr, indices = induced_subgraph(self.indptr, self.indices, nodes)
+        return [self.isos[node] for node in nodes], indptr, indices
+
+    def continent(self, continent: str, distance: int = 1) -> Tuple[List[str], array, array]:
+        """
+        Extracts the subgraph of the countries of a continent, see `subgraph`. With a `distance` above 1, two
+        countries are adjacent when they are at most `distance` borders apart within the continent, see
+        `power_adjacency`.
+        """
+        countries, indptr, indices = self.subgraph(self.nodes_in(continent))
+        if distance > 1:
+            indptr, indices = power_adjacency(indptr, indices, distance)
+        return countries, indptr, indices
+
+    def borders(self, continent: str) -> Dict[str, List[str]]:
+        """
+        Returns a dictionary mapping each country of a continent to the ISO A3 codes of its neighbors in the
+        dataset, including neighbors on other continents.
+        """
+        return {self.isos[i]: [self.isos[n] for n in self.neighbors(i)] for i in self.nodes_in(continent)}
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the index to the binary sidecar format read by `from_bytes`.
+        """
+        names = "\n".join(self.isos + self.continents).encode("utf-8")
+        header = _HEADER.pack(_MAGIC, _VERSION, self.digest, len(self.isos), len(self.indices), len(names))
+        return header + names + self.indptr.tobytes() + self.indices.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Optional["GraphIndex"]:
+        """
+        Deserializes an index written by `to_bytes`.
+
+        Returns:
+            Optional[GraphIndex]: The index, or None if `data` is not a sidecar of the current version.
+        """
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, digest, n, nnz, names_size = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            return None
+        offset = _HEADER.size
+        names = data[offset:offset + names_size].decode("utf-8").split("\n") if n else []
+        offset += names_size
+        indptr = array("i")
+        indptr.frombytes(data[offset:offset + (n + 1) * indptr.itemsize])
+        offset += (n + 1) * indptr.itemsize
+        indices = array("i")
+        indices.frombytes(data[offset:offset + nnz * indices.itemsize])
+        if len(names) != 2 * n or len(indptr) != n + 1 or len(indices) != nnz:
+            return None
+        return cls(names[:n], names[n:], indptr, indices, digest)
+
+
+def induced_subgraph(indptr: Sequence[int], indices: Sequence[int], nodes: Sequence[int]) -> Tuple[array, array]:
+    """
+    Extracts the CSR adjacency of the subgraph induced by `nodes`, renumbered from 0 in the given order.
+
+    Args:
+        indptr (Sequence[int]): The CSR offsets of the graph.
+        indices (Sequence[int]): The CSR neighbor indices of the graph.
+        nodes (Sequence[int]): The nodes to keep.
+
+    Returns:
+        Tuple[array, array]: The CSR `indptr` and `indices` arrays of the subgraph.
+    """
+    local = {node: i for i, node in enumerate(nodes)}
+    sub_indptr = array("i", [0])
+    sub_indices = array("i")
+    for node in nodes:
+        sub_indices.extend(sorted(local[n] for n in indices[indptr[node]:indptr[node + 1]] if n in local))
+        sub_indptr.append(len(sub_indices))
+    return sub_indptr, sub_indices
+
+
+def power_adjacency(indptr: Sequence[int], indices: Sequence[int], distance: int) -> Tuple[array, array]:
+    """
+    Computes the adjacency of the distance-k power of a graph: two nodes are adjacent when they are at most
+    `distance` borders apart. Every node's neighborhood is found once with a breadth-first search bounded to
+    `distance` levels.
+
+    Args:
+        indptr (Sequence[int]): The CSR offsets of the graph.
+        indices (Sequence[int]): The CSR neighbor indices of the graph.
+        distance (int): The neighborhood distance k, 1 returns a copy of the graph.
+
+    Returns:
+        Tuple[array, array]: The CSR `indptr` and `indices` arrays of the power graph.
+    """
+    if distance <= 1:
+        return array("i", indptr), array("i", indices)
+    power_indptr = array("i", [0])
+    power_indices = array("i")
+    for source in range(len(indptr) - 1):
+        seen = {source}
+        frontier = [source]
+        for _ in range(distance):
+            reached = []
+            for node in frontier:
+                for neighbor in indices[indptr[node]:indptr[node + 1]]:
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        reached.append(neighbor)
+            if not reached:
+                break
+            frontier = reached
+        seen.discard(source)
+        power_indices.extend(sorted(seen))
+        power_indptr.append(len(power_indices))
+    return power_indptr, power_indices
+
+
+def dataset_digest(path: str = DATASET_PATH) -> bytes:
+    """
+    Returns the SHA-1 digest of the content of a dataset file.
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def sidecar_path(path: str = DATASET_PATH) -> str:
+    """
+    Returns the path of the binary adjacency file that caches the index of a dataset.
+    """
+    return os.path.splitext(path)[0] + ".graph"
+
+
+def build_graph_index(path: str = DATASET_PATH, digest: Optional[bytes] = None) -> GraphIndex:
+    """
+    Builds the adjacency index of a dataset from its `iso_a3`, `continent` and `neighbors` columns. Geometries
+    are not parsed.
+
+    Args:
+        path (str, optional): The path of the CSV dataset. Defaults to DATASET_PATH.
+        digest (bytes, optional): The digest of the dataset, computed if not given.
+
+    Returns:
+        GraphIndex: The adjacency index of the dataset.
+    """
+    csv.field_size_limit(max(csv.field_size_limit(), 1 << 30))
+    isos, continents, neighbor_lists = [], [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            isos.append(row["iso_a3"])
+            continents.append(row["continent"])
+            neighbor_lists.append(row["neighbors"].split(", ") if row["neighbors"] else [])
+
+    iso_to_id = {iso: i for i, iso in enumerate(isos)}
+    adjacency = [set() for _ in isos]
+    for i, neighbors in enumerate(neighbor_lists):
+        for neighbor in neighbors:
+            j = iso_to_id.get(neighbor)
+            if j is not None and j != i:
+                adjacency[i].add(j)
+                adjacency[j].add(i)
+
+    indptr = array("i", [0])
+    indices = array("i")
+    for adj in adjacency:
+        indices.extend(sorted(adj))
+        indptr.append(len(indices))
+    return GraphIndex(isos, continents, indptr, indices, digest if digest is not None else dataset_digest(path))
+
+
+def load_graph_index(path: str = DATASET_PATH) -> GraphIndex:
+    """
+    Loads the adjacency index of a dataset, reading it from its sidecar file when the sidecar was built from the
+    current content of the dataset and rebuilding (and rewriting) it otherwise. Indexes are also cached per
+    process.
+
+    Args:
+        path (str, optional): The path of the CSV dataset. Defaults to DATASET_PATH.
+
+    Returns:
+        GraphIndex: The adjacency index of the dataset.
+    """
+    digest = dataset_digest(path)
+    key = os.path.abspath(path)
+    graph = _cache.get(key)
+    if graph is not None and graph.digest == digest:
+        return graph
+
+    sidecar = sidecar_path(path)
+    graph = None
+    try:
+        with open(sidecar, "rb") as f:
+            graph = GraphIndex.from_bytes(f.read())
+    except OSError:
+        pass
+    if graph is None or graph.digest != digest:
+        graph = build_graph_index(path, digest)
+        try:
+            tmp = f"{sidecar}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(graph.to_bytes())
+            os.replace(tmp, sidecar)
+        except OSError:
+            pass  # read-only checkout, the index is rebuilt on the next start
+
+    _cache[key] = graph
+    return graph
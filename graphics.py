@@ -1,52 +1,195 @@
-import geopandas as gpd
-import pandas as pd
-from shapely import wkt
-from typing import Dict
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PatchCollection, PathCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import Affine2D, IdentityTransform
 
-def draw_colored_map(solution: Dict[str, str], gdf: gpd.GeoDataFrame, continent: str, assignments_number: int) -> None:
+from geometry_store import ContinentGeometry, load_continent_geometry
+
+_layers: Dict[str, "BaseLayer"] = {}
+_headless_layers: Dict[str, "BaseLayer"] = {}
+
+
+def country_path(polygons: List[List]) -> Path:
+    """
+    Builds a single compound path of all the polygons and holes of a country.
+
+    Args:
+        polygons (List[List]): The polygons of the country, see `ContinentGeometry.polygons`.
+
+    Returns:
+        Path: The path of the country.
+    """
+    return Path.make_compound_path(*[Path(list(zip(ring[0::2], ring[1::2])))
+                                     for polygon in polygons for ring in polygon])
+
+
+def label_path(text: str, size: float) -> Path:
+    """
+    Returns the outline of a text in points, centered on the origin.
+    """
+    path = TextPath((0, 0), text, size=size)
+    extents = path.get_extents()
+    return path.transformed(Affine2D().translate(-(extents.x0 + extents.x1) / 2, -(extents.y0 + extents.y1) / 2))
+
+
+class BaseLayer(object):
+    """
+    A continent drawn once on a figure: the countries as a single collection, their labels as a second one and
+    the caption. Drawing a new coloring only recolors the collections.
+
+    Attributes:
+        geometry (ContinentGeometry): The geometry of the continent.
+        figure (Figure): The figure the continent is drawn on.
+        collection (PatchCollection): The countries, in the order of `geometry.isos`.
+        labels (PathCollection): The ISO A3 label of every country, drawn like scatter markers: sized in points
+                                 and placed at the centroids. Only the labels of the countries of the drawn
+                                 solution are opaque.
+        caption (Text): The text showing the number of assignments.
+    """
+
+    def __init__(self, geometry: ContinentGeometry, figure: Figure) -> None:
+        self.geometry = geometry
+        self.figure = figure
+        ax = self.axes = figure.add_subplot(1, 1, 1)
+        self.collection = PatchCollection([PathPatch(country_path(polygons)) for polygons in geometry.polygons],
+                                          facecolor="lightgrey", edgecolor="black")
+        ax.add_collection(self.collection)
+        ax.set_aspect("equal")
+
+        # Set map boundaries
+        minx, miny, maxx, maxy = geometry.bounds
+        if geometry.continent == "Europe":
+            ax.set_xlim(-40, 60)
+            ax.set_ylim(35, 80)
+            text_x, text_y = -40, 82
+        else:
+            ax.set_xlim(minx - 1, maxx + 1)
+            ax.set_ylim(miny - 1, maxy + 1)
+            text_x, text_y = minx, maxy + 2
+
+        self.labels = PathCollection([label_path(iso, 6) for iso in geometry.isos], sizes=[1],
+                                     offsets=geometry.centroids or None, offset_transform=ax.transData,
+                                     facecolors="none", edgecolors="none")
+        self.labels.set_transform(IdentityTransform())  # the label paths are in points, like scatter markers
+        ax.add_collection(self.labels, autolim=False)
+        self.caption = ax.text(text_x, text_y, "", fontsize=12, ha='left', va='center')
+
+    def recolor(self, solution: Dict[str, str], assignments_number: int) -> None:
+        """
+        Colors every country of the layer according to a solution, countries without a color in lightgrey, and
+        updates the labels and the caption.
+
+        Args:
+            solution (Dict[str, str]): A dictionary mapping country ISO A3 codes to their assigned colors.
+            assignments_number (int): The number of variable assignments made during the solution process.
+        """
+        self.collection.set_facecolor([solution.get(iso, 'lightgrey') for iso in self.geometry.isos])
+        self.labels.set_facecolor([(0, 0, 0, 1 if iso in solution else 0) for iso in self.geometry.isos])
+        self.caption.set_text(f"Assignment Number: {assignments_number}")
+
+
+def base_layer(continent: str) -> BaseLayer:
+    """
+    Returns the base layer of a continent on an interactive 12x12 figure, drawing it on the first call and
+    again once its figure has been closed.
+    """
+    layer = _layers.get(continent)
+    if layer is None or not plt.fignum_exists(layer.figure.number):
+        layer = _layers[continent] = BaseLayer(load_continent_geometry(continent), plt.figure(figsize=(12, 12)))
+    return layer
+
+
+def headless_layer(continent: str) -> BaseLayer:
+    """
+    Returns the base layer of a continent on a 12x12 figure with a non-interactive Agg canvas, which needs no
+    display. Layers are drawn once per process.
+    """
+    layer = _headless_layers.get(continent)
+    if layer is None:
+        figure = Figure(figsize=(12, 12))
+        FigureCanvasAgg(figure)
+        layer = _headless_layers[continent] = BaseLayer(load_continent_geometry(continent), figure)
+    return layer
+
+
+def render(continent: str, solution: Dict[str, str], assignments_number: int, path: str,
+           dpi: Optional[float] = None) -> str:
+    """
+    Renders the solution of a continent to an image file without a display. The format follows the extension
+    of `path`, e.g. PNG or SVG.
+
+    Args:
+        continent (str): The name of the continent.
+        solution (Dict[str, str]): A dictionary mapping country ISO A3 codes to their assigned colors.
+        assignments_number (int): The number of assignments made during the solution of the map coloring problem.
+        path (str): The path of the image file.
+        dpi (float, optional): The resolution of raster formats. Defaults to the figure's resolution.
+
+    Returns:
+        str: The path of the image file.
+    """
+    layer = headless_layer(continent)
+    layer.recolor(solution, assignments_number)
+    layer.figure.savefig(path, dpi=dpi if dpi is not None else "figure")
+    return path
+
+
+def _render_job(job: Tuple[str, Dict[str, str], int, str, Optional[float]]) -> str:
+    return render(*job)
+
+
+def render_many(jobs: Iterable[Tuple[str, Dict[str, str], int, str]], workers: Optional[int] = None,
+                dpi: Optional[float] = None) -> List[str]:
+    """
+    Renders many solutions to image files, see `render`, in a process pool. Every worker draws the base layer
+    of a continent once and recolors it for every later solution of that continent.
+
+    Args:
+        jobs (Iterable[Tuple[str, Dict[str, str], int, str]]): The continent, solution, number of assignments and
+                                                              image path of every rendering.
+        workers (int, optional): The number of worker processes; solutions are rendered in this process when 1.
+                                 Defaults to the number of CPUs.
+        dpi (float, optional): The resolution of raster formats. Defaults to the figure's resolution.
+
+    Returns:
+        List[str]: The paths of the image files, in the order of `jobs`.
+    """
+    jobs = [(*job, dpi) for job in jobs]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        return [_render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_render_job, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+
+def draw_colored_map(solution: Dict[str, str], layer: BaseLayer, assignments_number: int) -> None:
     """
-    Visualizes the solution to a map coloring problem for a specified continent by coloring each country based on
-    the solution provided. It annotates each country with its ISO A3 code, adjusts the map's view based on the continent,
-    and displays the total number of assignments made by the CSP solver.
+    Visualizes the solution to a map coloring problem by recoloring the base layer of a continent: every country
+    gets its color from the solution and is annotated with its ISO A3 code, and the total number of assignments
+    made by the CSP solver is displayed.
 
     Args:
         solution (Dict[str, str]): A dictionary mapping country ISO A3 codes to their assigned colors.
-        gdf (gpd.GeoDataFrame): A GeoDataFrame containing the geographic data of countries, including their continents
-                                and ISO A3 codes.
-        continent (str): The name of the continent to visualize.
+        layer (BaseLayer): The base layer of the continent to visualize.
         assignments_number (int): The number of variable assignments made during the solution process.
     """
-    # Filter for the selected continent and assign colors
-    selected_continent = gdf[gdf['continent'] == continent].copy()
-    selected_continent['color'] = selected_continent['iso_a3'].apply(lambda x: solution.get(x, 'lightgrey'))
-    
-    fig, ax = plt.subplots(1, figsize=(12, 12))
-    selected_continent.plot(ax=ax, color=selected_continent['color'], edgecolor='black')
-    
-    # Set map boundaries
-    minx, miny, maxx, maxy = selected_continent.total_bounds
-    if continent == "Europe":
-        ax.set_xlim(-40, 60)
-        ax.set_ylim(35, 80)
-        text_x, text_y = -40, 82
-    else:
-        ax.set_xlim(minx - 1, maxx + 1)
-        ax.set_ylim(miny - 1, maxy + 1)
-        text_x, text_y = minx, maxy + 2
-
-    # Annotate countries and display the assignment number
-    for idx, row in selected_continent.iterrows():
-        if row['iso_a3'] in solution:
-            plt.text(row.geometry.centroid.x, row.geometry.centroid.y, row['iso_a3'], fontsize=6, ha='center', va='center')
-    plt.text(text_x, text_y, f"Assignment Number: {assignments_number}", fontsize=12, ha='left', va='center')
+    layer.recolor(solution, assignments_number)
+    layer.figure.canvas.draw_idle()
     plt.show()
 
 def draw(continent: str, solution: Dict[str, str], assignments_number: int) -> None:
     """
-    Loads geographic data from a CSV file, transforms it into a GeoDataFrame, and then visualizes the map coloring
-    solution for a specific continent. This function serves as a high-level interface to prepare data and call
-    draw_colored_map with appropriate parameters.
+    Visualizes the map coloring solution for a specific continent. The geometries are parsed once and cached
+    next to the dataset (see `geometry_store`), and the continent is drawn once per process, so drawing another
+    solution only recolors it. This function serves as a high-level interface to prepare the layer and call
+    draw_colored_map.
 
     Args:
         continent (str): The name of the continent for which the map coloring solution should be visualized.
@@ -54,8 +197,4 @@ def draw(continent: str, solution: Dict[str, str], assignments_number: int) -> N
                                    assigned to that country as part of the map coloring solution.
         assignments_number (int): The number of assignments made during the solution of the map coloring problem.
     """
-    neighbors_df = pd.read_csv('./countries_dataset.csv')
-    neighbors_df['geometry'] = neighbors_df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(neighbors_df, geometry='geometry')
-    
-    draw_colored_map(solution, gdf, continent, assignments_number)
\ No newline at end of file
+    draw_colored_map(solution, base_layer(continent), assignments_number)
@@ -0,0 +1,231 @@
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from CSP import CSP, DEFAULT_COLORS
+from Solver import Solver
+
+
+def diff_borders(old: Dict[str, Iterable[str]], new: Dict[str, Iterable[str]]) -> Dict[str, List]:
+    """
+    Computes the delta between two border dictionaries, e.g. two outputs of `generate_borders_by_continent`, in
+    the form accepted by `IncrementalColoring.apply`. Neighbors that are not keys of a dictionary are ignored.
+
+    Args:
+        old (Dict[str, Iterable[str]]): The previous borders.
+        new (Dict[str, Iterable[str]]): The edited borders.
+
+    Returns:
+        Dict[str, List]: The "added_countries", "removed_countries", "added_borders" and "removed_borders".
+    """
+    def edges(borders):
+        return {tuple(sorted((country, neighbor))) for country, neighbors in borders.items()
+                for neighbor in neighbors if neighbor in borders and neighbor != country}
+
+    old_edges, new_edges = edges(old), edges(new)
+    return {
+        "added_countries": [country for country in new if country not in old],
+        "removed_countries": [country for country in old if country not in new],
+        "added_borders": sorted(new_edges - old_edges),
+        "removed_borders": sorted(edge for edge in old_edges - new_edges if edge[0] in new and edge[1] in new),
+    }
+
+
+class IncrementalColoring(object):
+    """
+    A coloring of a map that is kept valid while the map is edited.
+
+    Edits (added or removed countries and borders) are applied to a mutable adjacency in time proportional to
+    their size. Removing countries or borders never breaks a coloring; new countries and new borders between
+    countries of the same color are repaired by a bounded re-search: the conflicted countries are recolored with
+    the colors of their neighbors fixed, and when that fails within the node budget the region is grown by one
+    ring of neighbors at a time. Countries outside the region keep their colors and the countries of the region
+    try their previous color first.
+
+    Countries left without a color, because they had none in the initial coloring or because an edit left the map
+    without a coloring, are recolored again by every later edit until one succeeds.
+
+    Attributes:
+        neighbors (dict): For every country, the set of its neighboring countries.
+        coloring (dict): The color of every country that has one.
+        uncolored (set): The countries without a color.
+        colors (list): The colors that can be assigned.
+    """
+
+    def __init__(self, borders: Dict[str, Iterable[str]], coloring: Dict[str, str],
+                 colors: Optional[Sequence[str]] = None, node_budget: int = 1000) -> None:
+        """
+        Initializes an IncrementalColoring object.
+
+        Args:
+            borders (Dict[str, Iterable[str]]): For every country, its neighboring countries. Neighbors that are
+                                                not keys are ignored and the relation is made symmetric.
+            coloring (Dict[str, str]): A valid coloring of the map, e.g. a previous solution.
+            colors (Sequence[str], optional): The colors that can be assigned. Defaults to DEFAULT_COLORS.
+            node_budget (int, optional): The number of search nodes per region and per country of the region
+                                         after which the region is grown. Defaults to 1000.
+        """
+        self.neighbors = {country: set() for country in borders}
+        for country, neighbors in borders.items():
+            for neighbor in neighbors:
+                if neighbor in self.neighbors and neighbor != country:
+                    self.neighbors[country].add(neighbor)
+                    self.neighbors[neighbor].add(country)
+        self.coloring = {country: coloring[country] for country in self.neighbors if country in coloring}
+        self.uncolored = {country for country in self.neighbors if country not in self.coloring}
+        self.colors = list(colors) if colors is not None else list(DEFAULT_COLORS)
+        self.node_budget = node_budget
+
+    @classmethod
+    def from_adjacency(cls, countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int],
+                       coloring: Dict[str, str], **kwargs) -> "IncrementalColoring":
+        """
+        Creates an IncrementalColoring of a map given as a CSR adjacency, see `IncrementalColoring.__init__`.
+        """
+        borders = {country: [countries[j] for j in indices[indptr[i]:indptr[i + 1]]]
+                   for i, country in enumerate(countries)}
+        return cls(borders, coloring, **kwargs)
+
+    def apply(self, added_countries: Iterable[str] = (), removed_countries: Iterable[str] = (),
+              added_borders: Iterable[Tuple[str, str]] = (), removed_borders: Iterable[Tuple[str, str]] = ()
+              ) -> Tuple[Optional[Dict[str, str]], Dict]:
+        """
+        Applies an edit to the map and repairs the coloring.
+
+        A split region is removed and its parts added with their borders, merged regions are removed and the
+        merged one added. Borders may name countries added by the same edit, but not countries it removes.
+
+        Args:
+            added_countries (Iterable[str], optional): The new countries.
+            removed_countries (Iterable[str], optional): The removed countries; their borders are removed too.
+            added_borders (Iterable[Tuple[str, str]], optional): The new borders.
+            removed_borders (Iterable[Tuple[str, str]], optional): The removed borders.
+
+        Returns:
+            Tuple[Optional[Dict[str, str]], Dict]: The countries whose color changed or that got one, with their
+                                                   new color (None if the edited map has no coloring, in which
+                                                   case the conflicted countries are left uncolored), and the
+                                                   number of conflicts, the final radius and size of the
+                                                   repaired region, the search nodes and the time in seconds.
+
+        Raises:
+            ValueError: If an added border names a country removed by the same edit; the map is left unchanged.
+        """
+        start = time.perf_counter()
+        neighbors, coloring = self.neighbors, self.coloring
+        added_countries, removed_countries = list(added_countries), list(removed_countries)
+        added_borders = list(added_borders)
+        removed = set(removed_countries).difference(added_countries)
+        for a, b in added_borders:
+            if a in removed or b in removed:
+                raise ValueError(f"the added border {a}-{b} names a country removed by the same edit")
+        for country in removed_countries:
+            for neighbor in neighbors.pop(country, ()):
+                neighbors[neighbor].discard(country)
+            coloring.pop(country, None)
+            self.uncolored.discard(country)
+        for a, b in removed_borders:
+            if a in neighbors and b in neighbors:
+                neighbors[a].discard(b)
+                neighbors[b].discard(a)
+
+        conflicted = set(self.uncolored)  # countries a previous edit could not color
+        for country in added_countries:
+            neighbors.setdefault(country, set())
+            if country not in coloring:
+                conflicted.add(country)
+        for a, b in added_borders:
+            if a == b:
+                continue
+            neighbors.setdefault(a, set()).add(b)
+            neighbors.setdefault(b, set()).add(a)
+            for country in (a, b):
+                if country not in coloring:
+                    conflicted.add(country)
+            if a in conflicted or b in conflicted:
+                continue
+            if coloring[a] == coloring[b]:
+                # recolor the endpoint with fewer neighbors, it has the most free colors
+                conflicted.add(a if len(neighbors[a]) < len(neighbors[b]) else b)
+
+        changed, stats = self.repair(conflicted)
+        stats["time"] = time.perf_counter() - start
+        return changed, stats
+
+    def repair(self, conflicted: Set[str]) -> Tuple[Optional[Dict[str, str]], Dict]:
+        """
+        Recolors the conflicted countries, growing the recolored region ring by ring until its search succeeds
+        within the node budget, or without a budget once the region covers the whole components of the
+        conflicted countries. Only edits that leave the map without a coloring reach that last search, which
+        may then take as long as solving the components from scratch.
+
+        Args:
+            conflicted (Set[str]): The countries that must be recolored.
+
+        Returns:
+            Tuple[Optional[Dict[str, str]], Dict]: See `apply`.
+        """
+        coloring = self.coloring
+        stats = {"conflicts": len(conflicted), "radius": 0, "region": len(conflicted), "nodes": 0}
+        if not conflicted:
+            return {}, stats
+
+        region = list(conflicted)
+        in_region = set(conflicted)
+        frontier = region
+        while True:
+            grown = [neighbor for country in frontier for neighbor in self.neighbors[country]
+                     if neighbor not in in_region]
+            complete = not grown
+            solution, nodes = self._solve_region(region, None if complete else self.node_budget * len(region))
+            stats["nodes"] += nodes
+            stats["region"] = len(region)
+            if solution is not None:
+                break
+            if complete:
+                for country in conflicted:
+                    coloring.pop(country, None)
+                self.uncolored.update(conflicted)
+                return None, stats
+            frontier = []
+            for neighbor in grown:
+                if neighbor not in in_region:
+                    in_region.add(neighbor)
+                    frontier.append(neighbor)
+            region.extend(frontier)
+            stats["radius"] += 1
+
+        changed = {}
+        for country, color in solution:
+            if coloring.get(country) != color:
+                changed[country] = color
+        coloring.update(changed)
+        self.uncolored.difference_update(conflicted)
+        return changed, stats
+
+    def _solve_region(self, region: List[str], max_nodes: Optional[int]) -> Tuple[Optional[List[Tuple[str, str]]], int]:
+        """
+        Colors the countries of a region with the colors of the countries around it fixed. The countries of the
+        region try their current color first.
+
+        Returns:
+            Tuple[Optional[List[Tuple[str, str]]], int]: The coloring of the region (None if there is none within
+                                                         `max_nodes` nodes) and the number of nodes searched.
+        """
+        local = {country: i for i, country in enumerate(region)}
+        indptr = array("i", [0])
+        indices = array("i")
+        for country in region:
+            indices.extend(sorted(local[n] for n in self.neighbors[country] if n in local))
+            indptr.append(len(indices))
+
+        csp = CSP.from_adjacency(region, indptr, indices, colors=self.colors)
+        color_index = {color: c for c, color in enumerate(self.colors)}
+        for i, country in enumerate(region):
+            for neighbor in self.neighbors[country]:
+                if neighbor not in local and neighbor in self.coloring:
+                    if not csp.prune(i, 1 << color_index[self.coloring[neighbor]]):
+                        return None, 0
+        preferred = [color_index.get(self.coloring.get(country), -1) for country in region]
+        solver = Solver(csp, dsatur=True, max_nodes=max_nodes, preferred=preferred)
+        return solver.backjump_solver(), solver.nodes
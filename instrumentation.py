@@ -0,0 +1,182 @@
+import json
+import os
+import time
+from typing import Dict, Optional, Sequence
+
+# phase name -> methods of the Solver ("solver.") or of its CSP ("csp.") timed as that phase
+PHASES = {
+    "select": ["solver.select_unassigned_variable"],
+    "order": ["solver.ordered_domain_value"],
+    "propagate": ["solver.propagate", "solver.forward_check_conflicts"],
+    "ac3": ["solver.apply_AC3"],
+    "consistency": ["csp.is_consistent_index"],
+}
+
+
+class SearchHooks(object):
+    """
+    Receives the events of an instrumented search. Every method does nothing; subclass it and override the
+    events of interest, then pass an instance to `Instrumentation`.
+    """
+
+    def phase(self, name: str, start: float, duration: float) -> None:
+        """
+        Called after every timed call, with the phase name, the `time.perf_counter` start and the duration in
+        seconds.
+        """
+
+    def assigned(self, variable: int, color: int) -> None:
+        """
+        Called after every successful assignment of the color with index `color` to the variable `variable`.
+        """
+
+    def backtracked(self, variable: int) -> None:
+        """
+        Called when every value of the variable `variable` has failed.
+        """
+
+    def wiped_out(self, variable: int) -> None:
+        """
+        Called when the domain of the variable `variable` becomes empty.
+        """
+
+
+class Instrumentation(SearchHooks):
+    """
+    Profiles a search: accumulates the time spent in every phase (see PHASES), forwards the events of the
+    search to hooks and optionally records them as a Chrome trace (chrome://tracing or https://ui.perfetto.dev).
+
+    Attaching replaces the timed methods of the Solver and of its CSP by timed wrappers on those instances
+    only, so a Solver created without instrumentation runs the plain methods and pays nothing.
+
+    Attributes:
+        timers (dict): For every phase, the total time spent in it in seconds.
+        calls (dict): For every phase, the number of timed calls.
+        hooks (list): The `SearchHooks` the events are forwarded to.
+        events (list): The Chrome trace events when tracing, None otherwise.
+    """
+
+    def __init__(self, hooks: Sequence[SearchHooks] = (), trace: bool = False, trace_limit: int = 1000000) -> None:
+        """
+        Initializes an Instrumentation object.
+
+        Args:
+            hooks (Sequence[SearchHooks], optional): The hooks the events are forwarded to. Defaults to none.
+            trace (bool, optional): Flag indicating whether to record a Chrome trace. Defaults to False.
+            trace_limit (int, optional): The number of trace events after which recording stops, to bound the
+                                         memory of long searches. Defaults to 1000000.
+        """
+        self.timers = {phase: 0.0 for phase in PHASES}
+        self.calls = {phase: 0 for phase in PHASES}
+        self.hooks = list(hooks)
+        self.events = [] if trace else None
+        self.trace_limit = trace_limit
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+
+    def attach(self, solver) -> None:
+        """
+        Wraps the timed methods of a Solver and of its CSP. Called by `Solver` when it is given the
+        instrumentation.
+        """
+        owners = {"solver": solver, "csp": solver.csp}
+        for phase, methods in PHASES.items():
+            for method in methods:
+                owner, name = method.split(".")
+                setattr(owners[owner], name, self._timed(phase, getattr(owners[owner], name)))
+
+        csp = solver.csp
+        assign_index, prune = csp.assign_index, csp.prune
+
+        def assign(var, color):
+            if not assign_index(var, color):
+                return False
+            self.assigned(var, color)
+            return True
+
+        def pruned(var, mask):
+            if prune(var, mask):
+                return True
+            self.wiped_out(var)
+            return False
+
+        csp.assign_index = assign
+        csp.prune = pruned
+
+    def _timed(self, phase: str, method):
+        timers, calls = self.timers, self.calls
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            try:
+                return method(*args)
+            finally:
+                duration = clock() - start
+                timers[phase] += duration
+                calls[phase] += 1
+                if self.events is not None or self.hooks:
+                    self.phase(phase, start, duration)
+
+        return timed
+
+    def phase(self, name: str, start: float, duration: float) -> None:
+        self._record({"name": name, "ph": "X", "ts": self._microseconds(start), "dur": duration * 1e6})
+        for hook in self.hooks:
+            hook.phase(name, start, duration)
+
+    def assigned(self, variable: int, color: int) -> None:
+        for hook in self.hooks:
+            hook.assigned(variable, color)
+
+    def backtracked(self, variable: int) -> None:
+        self._record({"name": "backtrack", "ph": "i", "s": "t", "ts": self._microseconds(time.perf_counter()),
+                      "args": {"variable": variable}})
+        for hook in self.hooks:
+            hook.backtracked(variable)
+
+    def wiped_out(self, variable: int) -> None:
+        self._record({"name": "wipeout", "ph": "i", "s": "t", "ts": self._microseconds(time.perf_counter()),
+                      "args": {"variable": variable}})
+        for hook in self.hooks:
+            hook.wiped_out(variable)
+
+    def _microseconds(self, instant: float) -> float:
+        return (instant - self.origin) * 1e6
+
+    def _record(self, event: Dict) -> None:
+        if self.events is not None and len(self.events) < self.trace_limit:
+            event.update(pid=self.pid, tid=0, cat="search")
+            self.events.append(event)
+
+    def report(self, counters: Optional[Dict[str, int]] = None) -> str:
+        """
+        Formats the phase timers, and the counters of `Solver.statistics` when given, as a table.
+        """
+        lines = [f"{'phase':<14}{'calls':>12}{'time (s)':>12}{'us/call':>10}"]
+        for phase in PHASES:
+            calls = self.calls[phase]
+            per_call = f"{self.timers[phase] / calls * 1e6:.2f}" if calls else "-"
+            lines.append(f"{phase:<14}{calls:>12}{self.timers[phase]:>12.4f}{per_call:>10}")
+        if counters:
+            lines.append("")
+            lines.extend(f"{name:<20}{value:>12}" for name, value in counters.items())
+        return "\n".join(lines)
+
+    def chrome_trace(self, counters: Optional[Dict[str, int]] = None) -> Dict:
+        """
+        Returns the recorded events in the Chrome trace event format, with the counters of `Solver.statistics`
+        as metadata when given.
+        """
+        return {
+            "traceEvents": list(self.events or []),
+            "displayTimeUnit": "ms",
+            "otherData": {"counters": counters or {}, "truncated": len(self.events or []) >= self.trace_limit},
+        }
+
+    def write_trace(self, path: str, counters: Optional[Dict[str, int]] = None) -> None:
+        """
+        Writes the Chrome trace to a JSON file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(counters), f)
@@ -1,9 +1,14 @@
 import argparse
+import json
+import time
 from enum import Enum
-from CSP import CSP
+from CSP import CSP, palette
 from Solver import Solver
-from map_generator import generate_borders_by_continent
-from graphics import draw
+from graph_index import load_graph_index
+from chromatic import chromatic_number
+from instrumentation import Instrumentation
+from solve import positive_int
+from solve_cache import SolveCache
 import random
 
 class Continent(Enum):
@@ -16,6 +21,30 @@ class Continent(Enum):
         return self.value
     
 
+def show_solution(continent, result, assignments_number, output=None):
+    """
+    Draws a solution of a continent, or writes it to an image file.
+
+    Args:
+        continent (str): The name of the continent.
+        result (list): The (country, color) assignments of the solution, or None if no coloring was found.
+        assignments_number (int): The number of assignments made during the solution process.
+        output (str, optional): The path of the image file. Defaults to None, which shows the map.
+    """
+    if result is None:
+        print("no coloring found")
+        return
+    from graphics import draw, render  # matplotlib is only imported once there is a map to show
+
+    finalresult = {}
+    for i in result:
+        finalresult[i[0]] = i[1]
+    if output:
+        render(continent, finalresult, assignments_number, output)
+    else:
+        draw(solution=finalresult, continent=continent, assignments_number=assignments_number)
+
+
 def main():
     """
     Main function to solve the map coloring problem using CSP.
@@ -26,7 +55,23 @@ def main():
     - -m, --map: Specify the map to solve the coloring problem on. Must be one of [Asia, Africa, America, Europe].
     - -lcv, --lcv: Enable least constraint value (LCV) as an order-type optimizer.
     - -mrv, --mrv: Enable minimum remaining values (MRV) as an order-type optimizer.
+    - -dsatur, --dsatur: Enable saturation degree (DSatur) with degree tie-breaking as an order-type optimizer, instead of MRV.
     - -ac3, --arc-consistency: Enable arc consistency as a mechanism to eliminate the domain of variables achieving an optimized solution.
+    - -fc, --forward-checking: Enable forward checking; ignored when arc consistency is enabled, which subsumes it.
+    - -cbj, --backjumping: Use the iterative search engine with forward checking and conflict-directed backjumping.
+    - -k, --colors: The number of colors that can be assigned, 4 by default; the palette is extended beyond red, green, blue and yellow as needed.
+    - -cn, --chromatic-number: Search for the fewest colors that color the map instead of using --colors, printing the bounds and the time of every number of colors tried.
+    - --count: Count the colorings of the map with --colors colors instead of drawing one; connected components are counted separately and interchangeable colors once.
+    - --enumerate: Print up to N colorings as JSON lines instead of drawing one (0 for all of them), one per class of colorings that only differ by a permutation of the colors.
+    - -mc, --min-conflicts: Use the min-conflicts local search with a tabu list, for very large maps; falls back to the backjumping engine (with the ordering options above) when it gives up.
+    - --portfolio: Race several solver configurations and randomized restarts in parallel processes; the first coloring wins.
+    - --workers: The number of worker processes of the portfolio.
+    - --decompose: Solve every connected component of the map independently, in --workers processes.
+    - --biconnected: With --decompose, split the components further into biconnected blocks.
+    - -o, --output: Write the map to an image file instead of showing it; the format follows the extension, e.g. PNG or SVG. Needs no display.
+    - --profile: Print the time spent in every phase of the search and its counters (nodes, consistency checks, backtracks, arc revisions, wipeouts).
+    - --trace: Write a Chrome trace of the search to the given JSON file (open it in chrome://tracing or Perfetto).
+    - --cache: Cache the results of the plain search in the given directory, keyed by the dataset, the map and the search options; a cached result is drawn without loading the map or searching, and results are dropped when countries_dataset.csv changes.
     - -ND, --Neighborhood-distance: The value determines the threshold for neighboring regions' similarity in color, with a default of 1 ensuring adjacent regions have distinct colors; increasing it, for instance to 2, extends this dissimilarity to the neighbors of neighbors.
     """
     parser = argparse.ArgumentParser(
@@ -53,12 +98,104 @@ def main():
         action="store_true",
         help="Enable minimum remaining values (MRV) as a order-type optimizer"
     )
+    parser.add_argument(
+        "-dsatur",
+        "--dsatur",
+        action="store_true",
+        help="Enable saturation degree (DSatur) with degree tie-breaking as a order-type optimizer, instead of MRV"
+    )
     parser.add_argument(
         "-ac3",
         "--arc-consistency",
         action="store_true",
         help="Enable arc consistency as a mechanism to eliminate the domain of variables achieving an optimized solution"
     )
+    parser.add_argument(
+        "-fc",
+        "--forward-checking",
+        action="store_true",
+        help="Enable forward checking to remove the assigned value from the domains of the neighbors after every assignment"
+    )
+    parser.add_argument(
+        "-cbj",
+        "--backjumping",
+        action="store_true",
+        help="Use the iterative search engine with forward checking and conflict-directed backjumping"
+    )
+    parser.add_argument(
+        "-k",
+        "--colors",
+        type=positive_int,
+        default=4,
+        help="Number of colors that can be assigned, defaults to 4"
+    )
+    parser.add_argument(
+        "-cn",
+        "--chromatic-number",
+        action="store_true",
+        help="Search for the fewest colors that color the map, printing the time of every number of colors tried"
+    )
+    parser.add_argument(
+        "--count",
+        action="store_true",
+        help="Count the colorings of the map instead of drawing one"
+    )
+    parser.add_argument(
+        "--enumerate",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Print up to N colorings as JSON lines, one per permutation class of the colors (0 for all)"
+    )
+    parser.add_argument(
+        "-mc",
+        "--min-conflicts",
+        action="store_true",
+        help="Use the min-conflicts local search with a tabu list, falling back to the backjumping engine when it gives up"
+    )
+    parser.add_argument(
+        "--portfolio",
+        action="store_true",
+        help="Race several solver configurations and randomized restarts in parallel processes, the first coloring wins"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes of the portfolio, defaults to the number of CPUs"
+    )
+    parser.add_argument(
+        "--decompose",
+        action="store_true",
+        help="Solve every connected component of the map independently, in --workers processes"
+    )
+    parser.add_argument(
+        "--biconnected",
+        action="store_true",
+        help="With --decompose, split the components further into biconnected blocks"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Write the map to an image file (PNG, SVG, ...) instead of showing it"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the time spent in every phase of the search and its counters"
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Write a Chrome trace of the search to the given JSON file"
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        metavar="DIR",
+        help="Cache the results of the plain search in the given directory"
+    )
     parser.add_argument(
         "-ND",
         "--Neighborhood-distance",
@@ -68,20 +205,97 @@ def main():
     )
 
     args = parser.parse_args()
-    borders = generate_borders_by_continent(continent=str(args.map))
+    colors = palette(args.colors)
+    search = dict(domain_heuristics=args.lcv, variable_heuristics=args.mrv, AC_3=args.arc_consistency,
+                  forward_checking=args.forward_checking, dsatur=args.dsatur, backjumping=args.backjumping,
+                  local_search=args.min_conflicts, colors=colors)
+    cache = None
+    keys = []
+    if args.cache is not None and not (args.count or args.enumerate is not None or args.chromatic_number
+                                       or args.portfolio or args.decompose or args.profile or args.trace):
+        cache = SolveCache(directory=args.cache)
+        keys.append(cache.map_key(str(args.map), args.Neighborhood_distance, search))
+        cached = cache.get(keys[0])
+        if cached is not None:
+            print("cached result")
+            show_solution(str(args.map), cached["solution"], cached["assignments"], args.output)
+            return
+    countries, indptr, indices = load_graph_index().continent(str(args.map), distance=args.Neighborhood_distance)
     
     "*** YOUR CODE HERE ***"
     
 
-    if(borders):
-        csp = CSP(*list(borders.keys()),**borders)
-        solver = Solver(csp=csp)
-        result = solver.backtrack_solver() #your solution
-        finalresult = {}
-        for i in result:
-            finalresult[i[0]] = i[1]
-        assignments_number = solver.csp.assignments_number #number of assignments that you can get it from solver.csp.assignments_number
-        draw(solution=finalresult, continent=str(args.map), assignments_number=assignments_number)
+    if(countries):
+        if args.count or args.enumerate is not None:
+            solver = Solver(csp=CSP.from_adjacency(countries, indptr, indices, colors=colors), domain_heuristics=args.lcv,
+                            variable_heuristics=args.mrv, dsatur=args.dsatur, forward_checking=True)
+            start = time.perf_counter()
+            if args.count:
+                print(f"{solver.count_solutions()} colorings with {args.colors} colors")
+            else:
+                for number, solution in enumerate(solver.iter_solutions()):
+                    if args.enumerate and number >= args.enumerate:
+                        break
+                    print(json.dumps(dict(solution)))
+            print(f"{solver.nodes} nodes, {time.perf_counter() - start:.4f} s")
+            return
+        if args.chromatic_number:
+            result, stats = chromatic_number(countries, indptr, indices)
+            print(f"clique lower bound {stats['lower_bound']}, DSatur upper bound {stats['upper_bound']} "
+                  f"({stats['bounds_time']:.4f} s)")
+            print(f"{'colors':>6}{'assignments':>12}{'nodes':>10}{'time (s)':>10}  status")
+            for step in stats["steps"]:
+                print(f"{step['k']:>6}{step['assignments']:>12}{step['nodes']:>10}{step['time']:>10.4f}  {step['status']}")
+            print(f"chromatic number: {stats['chromatic_number']}")
+            assignments_number = sum(step["assignments"] for step in stats["steps"])
+        elif args.portfolio:
+            from portfolio import DEFAULT_PORTFOLIO, solve_portfolio
+
+            configurations = [(name, dict(config, colors=colors)) for name, config in DEFAULT_PORTFOLIO]
+            result, stats = solve_portfolio(countries, indptr, indices, configurations=configurations,
+                                            workers=args.workers)
+            print(f"{'configuration':<22}{'assignments':>12}{'nodes':>10}{'restarts':>10}{'time (s)':>10}  status")
+            for stat in stats:
+                status = "cancelled" if stat["cancelled"] else "failed: " + stat["error"] if stat["error"] else "won"
+                print(f"{stat['name']:<22}{stat['assignments']:>12}{stat['nodes']:>10}{stat['restarts']:>10}"
+                      f"{stat['time']:>10.4f}  {status}")
+            assignments_number = stats[0]["assignments"]
+        elif args.decompose:
+            from decomposition import solve_decomposed
+
+            result, stats = solve_decomposed(countries, indptr, indices, config=search, biconnected=args.biconnected,
+                                             workers=args.workers)
+            print(f"{stats['parts']} parts solved, {stats['isolated']} isolated countries")
+            assignments_number = stats["assignments"]
+        else:
+            if cache is not None:
+                keys.append(cache.graph_key(countries, indptr, indices, search))
+                cached = cache.get(keys[-1])
+                if cached is not None:
+                    cache.put(keys[0], cached)
+                    print("cached result")
+                    show_solution(str(args.map), cached["solution"], cached["assignments"], args.output)
+                    return
+            start = time.perf_counter()
+            csp = CSP.from_adjacency(countries, indptr, indices, colors=colors)
+            instrumentation = Instrumentation(trace=args.trace is not None) if args.profile or args.trace else None
+            solver = Solver(csp=csp, domain_heuristics=args.lcv, variable_heuristics=args.mrv, AC_3=args.arc_consistency,
+                            forward_checking=args.forward_checking, dsatur=args.dsatur, instrumentation=instrumentation)
+            if args.min_conflicts:
+                result = solver.min_conflicts_solver()
+            else:
+                result = solver.backjump_solver() if args.backjumping else solver.backtrack_solver() #your solution
+            if args.profile:
+                print(instrumentation.report(solver.statistics()))
+            if args.trace:
+                instrumentation.write_trace(args.trace, solver.statistics())
+            assignments_number = solver.csp.assignments_number #number of assignments that you can get it from solver.csp.assignments_number
+            if cache is not None and not solver.limit_reached:
+                entry = {"solution": result, "assignments": assignments_number, "nodes": solver.nodes,
+                         "time": time.perf_counter() - start}
+                for key in keys:
+                    cache.put(key, entry)
+        show_solution(str(args.map), result, assignments_number, args.output)
     else:
         print("no borders")
 
@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from CSP import CSP
+from Solver import Solver
+
+# Solver configurations raced by default; every entry is a name and the keyword arguments of `Solver`
+DEFAULT_PORTFOLIO = [
+    ("mrv+fc", dict(variable_heuristics=True, forward_checking=True)),
+    ("dsatur+mac+lcv", dict(dsatur=True, AC_3=True, domain_heuristics=True)),
+    ("cbj", dict(backjumping=True)),
+    ("cbj+dsatur", dict(backjumping=True, dsatur=True)),
+    ("cbj+mrv+lcv", dict(backjumping=True, variable_heuristics=True, domain_heuristics=True)),
+    ("restarts+mrv+fc", dict(variable_heuristics=True, forward_checking=True, restarts=True)),
+    ("restarts+cbj+dsatur", dict(backjumping=True, dsatur=True, restarts=True)),
+    ("restarts+cbj", dict(backjumping=True, restarts=True)),
+    ("min-conflicts", dict(local_search=True, dsatur=True)),
+]
+
+
+def run_configuration(countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int], name: str,
+                      config: Dict, seed: int = 0, stop_event=None, restart_nodes: int = 100) -> Dict:
+    """
+    Solves a map with one solver configuration. Runs in a worker process of `solve_portfolio`.
+
+    The configuration holds the keyword arguments of `Solver`, plus `backjumping` to use
+    `Solver.backjump_solver`, `local_search` to use `Solver.min_conflicts_solver` (falling back to
+    `Solver.backjump_solver`), `colors` for the palette of the CSP (see `CSP.palette`) and `restarts` to run
+    randomized restarts: every attempt shuffles the value and variable orders with a new seed and gives up after
+    a node budget that doubles from `restart_nodes`.
+
+    Args:
+        countries (Sequence[str]): The countries of the map, in index order.
+        indptr (Sequence[int]): The CSR offsets of the map's adjacency.
+        indices (Sequence[int]): The CSR neighbor indices of the map's adjacency.
+        name (str): The name of the configuration, copied to the result.
+        config (Dict): The configuration.
+        seed (int, optional): The seed of the first randomized attempt. Defaults to 0.
+        stop_event (optional): An event shared between the workers; the search gives up once it is set.
+        restart_nodes (int, optional): The node budget of the first randomized attempt. Defaults to 100.
+
+    Returns:
+        Dict: The name of the configuration, the solution (or None), whether the search was cancelled, the error
+              that ended the worker (None here, set by `solve_portfolio` for crashed workers), and the number of
+              assignments, nodes, restarts and the wall time of the worker.
+    """
+    config = dict(config)
+    backjumping = config.pop("backjumping", False)
+    local_search = config.pop("local_search", False)
+    colors = config.pop("colors", None)
+    restarts = config.pop("restarts", False)
+    stop = stop_event.is_set if stop_event is not None else None
+
+    start = time.perf_counter()
+    assignments = nodes = attempt = 0
+    result = None
+    cancelled = False
+    while True:
+        csp = CSP.from_adjacency(countries, indptr, indices, colors=colors)
+        solver = Solver(csp, stop=stop, seed=seed + attempt if restarts else None,
+                        max_nodes=restart_nodes << attempt if restarts else None, **config)
+        if local_search:
+            result = solver.min_conflicts_solver()
+        else:
+            result = solver.backjump_solver() if backjumping else solver.backtrack_solver()
+        assignments += csp.assignments_number
+        nodes += solver.nodes
+        if result is not None or not solver.limit_reached:
+            break
+        if stop is not None and stop():
+            cancelled = True
+            break
+        attempt += 1
+
+    return {
+        "name": name,
+        "solution": result,
+        "cancelled": cancelled,
+        "error": None,
+        "assignments": assignments,
+        "nodes": nodes,
+        "restarts": attempt,
+        "time": time.perf_counter() - start,
+    }
+
+
+def solve_portfolio(countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int],
+                    configurations: Optional[List[Tuple[str, Dict]]] = None, workers: Optional[int] = None,
+                    seed: int = 0) -> Tuple[Optional[List[Tuple[str, str]]], List[Dict]]:
+    """
+    Races several solver configurations on the same map in a process pool. The first configuration that finds
+    a coloring (or proves that none exists) wins and the other workers are asked to stop.
+
+    Args:
+        countries (Sequence[str]): The countries of the map, in index order.
+        indptr (Sequence[int]): The CSR offsets of the map's adjacency.
+        indices (Sequence[int]): The CSR neighbor indices of the map's adjacency.
+        configurations (List[Tuple[str, Dict]], optional): The named configurations to race, see
+                                                           `run_configuration`. Defaults to DEFAULT_PORTFOLIO.
+        workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        seed (int, optional): The base seed of the randomized configurations. Defaults to 0.
+
+    Returns:
+        Tuple[Optional[List[Tuple[str, str]]], List[Dict]]: The winning coloring (None if the map has no
+                                                            coloring) and the statistics of every worker, the
+                                                            winner first.
+    """
+    configurations = configurations if configurations is not None else DEFAULT_PORTFOLIO
+    workers = workers or min(len(configurations), os.cpu_count() or 1)
+    with multiprocessing.Manager() as manager:
+        stop_event = manager.Event()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            names = {executor.submit(run_configuration, countries, indptr, indices, name, config,
+                                     seed + 1000 * i, stop_event): name
+                     for i, (name, config) in enumerate(configurations)}
+            pending = set(names)
+            stats = []
+            winner = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.cancelled() or future.exception() is not None:
+                        # never started, or crashed (e.g. the recursive engine on a very deep map)
+                        stats.append({"name": names[future], "solution": None, "cancelled": future.cancelled(),
+                                      "error": None if future.cancelled() else repr(future.exception()),
+                                      "assignments": 0, "nodes": 0, "restarts": 0, "time": 0.0})
+                        continue
+                    stat = future.result()
+                    if winner is None and not stat["cancelled"]:
+                        winner = stat
+                        stop_event.set()
+                        for other in pending:
+                            other.cancel()
+                    else:
+                        stat["cancelled"] = True
+                    stats.append(stat)
+
+    stats.sort(key=lambda stat: stat is not winner)
+    return (winner["solution"] if winner is not None else None), stats
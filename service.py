@@ -0,0 +1,379 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from batch import MapLoader, job_config
+from portfolio import run_configuration
+from solve_cache import SolveCache, settings_key
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+DEADLINE_EXCEEDED = -32001
+REQUEST_CANCELLED = -32800
+
+
+class RPCError(Exception):
+    """
+    Raised by a service method to answer a request with a JSON-RPC error.
+    """
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class _InFlight(object):
+    """
+    A solve running in the process pool and the number of requests waiting for it.
+    """
+
+    def __init__(self, future, stop_event) -> None:
+        self.future = future
+        self.stop_event = stop_event
+        self.waiters = 0
+
+
+class SolveService(object):
+    """
+    Serves coloring requests concurrently from an asyncio event loop.
+
+    Searches run in a process pool, so the loop keeps answering while they run. Identical requests that arrive
+    while one of them is being solved wait for that solve instead of starting another one. Every request has a
+    deadline, and a request can be cancelled; a solve that no request waits for any more is asked to stop
+    through an event shared with its worker, like the losers of a portfolio.
+
+    Methods (JSON-RPC):
+        solve: Colors a map. The parameters are a batch job (see `batch.MapLoader.load` and `batch.FLAGS`) and
+               an optional "timeout" in seconds; the result holds the "coloring" (null if the map has none),
+               "assignments_number", "nodes", "time" and whether it was "cached" or "coalesced".
+        cancel: Cancels the pending request whose JSON-RPC id is the "id" parameter.
+        stats: Returns the number of requests, coalesced requests and solves in flight, and the cache
+               statistics.
+
+    Attributes:
+        workers (int): The number of worker processes.
+        timeout (float): The default deadline of a solve request in seconds.
+        cache (SolveCache): The cache of the results, None without one.
+        requests (int): The number of solve requests received.
+        coalesced (int): The number of solve requests answered by a solve started for another request.
+    """
+
+    def __init__(self, workers: Optional[int] = None, timeout: float = 60.0, cache: Optional[SolveCache] = None,
+                 loader: Optional[MapLoader] = None) -> None:
+        """
+        Initializes a SolveService object. The worker processes are started by the first solve.
+
+        Args:
+            workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+            timeout (float, optional): The default deadline of a solve request in seconds. Defaults to 60.
+            cache (SolveCache, optional): The cache of the results. Defaults to None (no caching).
+            loader (MapLoader, optional): The loader of the maps. Defaults to a new loader of the bundled dataset.
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.cache = cache
+        self.loader = loader if loader is not None else MapLoader()
+        self.requests = 0
+        self.coalesced = 0
+        self._executor = None
+        self._manager = None
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._tasks: Dict = {}
+        self._cancelled = set()
+
+    def close(self) -> None:
+        """
+        Stops the running solves and shuts the worker processes down.
+        """
+        for solve in self._in_flight.values():
+            solve.stop_event.set()
+        self._in_flight.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    async def solve(self, params: Dict) -> Dict:
+        """
+        Colors the map of a job, see the `solve` method of the service.
+
+        Args:
+            params (Dict): The job and an optional "timeout" in seconds.
+
+        Returns:
+            Dict: The result of the job.
+
+        Raises:
+            RPCError: If the job is invalid or its deadline passes first.
+        """
+        if not isinstance(params, dict) or not (params.get("map") or params.get("borders")):
+            raise RPCError(INVALID_PARAMS, "a solve needs a \"map\" or \"borders\"")
+        job = dict(params)
+        timeout = job.pop("timeout", self.timeout)
+        try:
+            config = job_config(job)
+        except ValueError as error:
+            raise RPCError(INVALID_PARAMS, str(error))
+        self.requests += 1
+
+        keys = []
+        cache = self.cache
+        if cache is not None and job.get("map") and not job.get("borders"):
+            keys.append(cache.map_key(job["map"], job.get("ND", 1), config))
+            cached = cache.get(keys[0])
+            if cached is not None:
+                return _response(cached, cached=True)
+        key = json.dumps([job.get("map"), job.get("borders"), job.get("ND", 1), settings_key(config)])
+        solve = self._in_flight.get(key)
+        coalesced = solve is not None
+        if coalesced:
+            self.coalesced += 1
+        else:
+            try:
+                countries, indptr, indices = self.loader.load(job)
+            except (OSError, KeyError, ValueError) as error:
+                raise RPCError(INVALID_PARAMS, repr(error))
+            if cache is not None:
+                keys.append(cache.graph_key(countries, indptr, indices, config))
+                cached = cache.get(keys[-1])
+                if cached is not None:
+                    for other in keys[:-1]:
+                        cache.put(other, cached)
+                    return _response(cached, cached=True)
+            solve = self._start(key, keys, countries, indptr, indices, config)
+
+        solve.waiters += 1
+        try:
+            result = await asyncio.wait_for(asyncio.shield(solve.future), timeout)
+        except asyncio.TimeoutError:
+            raise RPCError(DEADLINE_EXCEEDED, f"no result within {timeout} s")
+        finally:
+            solve.waiters -= 1
+            if not solve.waiters and not solve.future.done():
+                # nobody waits for the solve any more: stop it and let the next request start a new one
+                solve.stop_event.set()
+                solve.future.cancel()
+                if self._in_flight.get(key) is solve:
+                    del self._in_flight[key]
+        return _response(result, coalesced=coalesced)
+
+    def _start(self, key: str, keys, countries, indptr, indices, config: Dict) -> _InFlight:
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        stop_event = self._manager.Event()
+        future = asyncio.wrap_future(self._executor.submit(run_configuration, countries, indptr, indices, key, config,
+                                                           0, stop_event))
+        solve = self._in_flight[key] = _InFlight(future, stop_event)
+
+        def done(future):
+            if self._in_flight.get(key) is solve:
+                del self._in_flight[key]
+            if future.cancelled() or future.exception() is not None or future.result()["cancelled"]:
+                return
+            if self.cache is not None:
+                result = future.result()
+                entry = {name: result[name] for name in ("solution", "assignments", "nodes", "time")}
+                for cache_key in keys:
+                    self.cache.put(cache_key, entry)
+
+        future.add_done_callback(done)
+        return solve
+
+    def statistics(self) -> Dict:
+        """
+        Returns the statistics of the `stats` method.
+        """
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "cache": self.cache.statistics() if self.cache is not None else None,
+        }
+
+    async def handle(self, request) -> Optional[Dict]:
+        """
+        Answers a JSON-RPC request.
+
+        Args:
+            request: The decoded request.
+
+        Returns:
+            Dict: The JSON-RPC response, or None for a notification (a request without "id").
+        """
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return _error(None, INVALID_REQUEST, "invalid request")
+        request_id = request.get("id")
+        params = request.get("params", {})
+        try:
+            if request["method"] == "solve":
+                task = asyncio.current_task()
+                if request_id is not None:
+                    self._tasks[request_id] = task
+                try:
+                    result = await self.solve(params)
+                finally:
+                    if self._tasks.get(request_id) is task:
+                        del self._tasks[request_id]
+            elif request["method"] == "cancel":
+                task = self._tasks.get(params.get("id")) if isinstance(params, dict) else None
+                if task is not None:
+                    self._cancelled.add(params["id"])
+                    task.cancel()
+                result = {"cancelled": task is not None}
+            elif request["method"] == "stats":
+                result = self.statistics()
+            else:
+                raise RPCError(METHOD_NOT_FOUND, f"unknown method {request['method']!r}")
+        except RPCError as error:
+            return _error(request_id, error.code, error.message) if request_id is not None else None
+        except asyncio.CancelledError:
+            if request_id not in self._cancelled:
+                raise  # the server is shutting down, not a cancel request
+            self._cancelled.discard(request_id)
+            return _error(request_id, REQUEST_CANCELLED, "request cancelled")
+        except Exception as error:
+            # e.g. a worker that crashed
+            return _error(request_id, INTERNAL_ERROR, repr(error)) if request_id is not None else None
+        if request_id is None:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def handle_line(self, line: bytes) -> Optional[Dict]:
+        """
+        Answers a JSON-RPC request encoded as JSON.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return _error(None, PARSE_ERROR, "parse error")
+        return await self.handle(request)
+
+
+def _response(result: Dict, cached: bool = False, coalesced: bool = False) -> Dict:
+    return {
+        "coloring": dict(result["solution"]) if result["solution"] is not None else None,
+        "assignments_number": result["assignments"],
+        "nodes": result["nodes"],
+        "time": result["time"],
+        "cached": cached,
+        "coalesced": coalesced,
+    }
+
+
+def _error(request_id, code: int, message: str) -> Dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+async def serve_stdio(service: SolveService) -> None:
+    """
+    Serves JSON-RPC requests read from standard input, one per line, and writes every response to standard
+    output as one line as soon as it is ready, so responses may come out of order. Returns at the end of the
+    input once every request has been answered.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=1 << 24)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    async def answer(line):
+        response = await service.handle_line(line)
+        if response is not None:
+            sys.stdout.write(json.dumps(response) + "\n")
+            sys.stdout.flush()
+
+    tasks = set()
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if line.strip():
+            task = asyncio.create_task(answer(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def serve_http(service: SolveService, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """
+    Serves JSON-RPC requests POSTed over HTTP/1.1, one request per connection. Runs until cancelled.
+    """
+
+    async def connection(reader, writer):
+        try:
+            request_line = await reader.readline()
+            length = 0
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value.strip())
+            if not request_line.startswith(b"POST "):
+                status, response = "405 Method Not Allowed", _error(None, INVALID_REQUEST, "POST a JSON-RPC request")
+            else:
+                status, response = "200 OK", await service.handle_line(await reader.readexactly(length))
+            body = json.dumps(response).encode() if response is not None else b""
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """
+    Local solve service.
+
+    Command-line arguments:
+    - --http: Serve JSON-RPC over HTTP on the given HOST:PORT instead of standard input and output.
+    - --workers: The number of worker processes. Defaults to the number of CPUs.
+    - --timeout: The default deadline of a solve request in seconds. Default is 60.
+    - --cache: Cache the results in memory.
+    - --cache-dir: Also keep the cached results in the given directory, shared between runs.
+    """
+    parser = argparse.ArgumentParser(
+        prog="Map Coloring Service",
+        description="Serves map coloring requests as JSON-RPC over standard input and output or HTTP",
+    )
+    parser.add_argument("--http", default=None, metavar="HOST:PORT", help="Serve JSON-RPC over HTTP")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Default deadline of a solve in seconds")
+    parser.add_argument("--cache", action="store_true", help="Cache the results in memory")
+    parser.add_argument("--cache-dir", default=None, help="Directory of the on-disk tier of the cache")
+    args = parser.parse_args()
+
+    cache = SolveCache(directory=args.cache_dir) if args.cache or args.cache_dir else None
+    service = SolveService(workers=args.workers, timeout=args.timeout, cache=cache)
+    try:
+        if args.http:
+            host, _, port = args.http.rpartition(":")
+            asyncio.run(serve_http(service, host or "127.0.0.1", int(port)))
+        else:
+            asyncio.run(serve_stdio(service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import json
+import sys
+import time
+from typing import Dict
+
+from CSP import CSP, palette
+from Solver import Solver
+from graph_index import load_graph_index
+
+CONTINENTS = ["Asia", "Africa", "America", "Europe"]
+
+
+def positive_int(text: str) -> int:
+    """
+    Parses a positive integer command-line argument, e.g. a number of colors.
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, not {text}")
+    return value
+
+
+def solve(continent: str, distance: int = 1, colors: int = 4, backjumping: bool = False,
+          local_search: bool = False, **solver_flags) -> Dict:
+    """
+    Colors a continent of the dataset. Only the solver and the adjacency index are used: the borders are read
+    from the precomputed sidecar of the dataset (see `graph_index`), and neither geometries nor plotting
+    libraries are loaded.
+
+    Args:
+        continent (str): The name of the continent.
+        distance (int, optional): The neighborhood distance. Defaults to 1.
+        colors (int, optional): The number of colors. Defaults to 4.
+        backjumping (bool, optional): Flag indicating whether to use `Solver.backjump_solver`. Defaults to False.
+        local_search (bool, optional): Flag indicating whether to use `Solver.min_conflicts_solver`. Defaults to
+                                       False.
+        **solver_flags: Keyword arguments forwarded to `Solver`.
+
+    Returns:
+        Dict: The "coloring" (a dictionary mapping countries to colors, None if the map has no coloring),
+              "assignments_number", "nodes" and "time" in seconds, as in the results of `batch.run_batch`.
+    """
+    start = time.perf_counter()
+    countries, indptr, indices = load_graph_index().continent(continent, distance=distance)
+    csp = CSP.from_adjacency(countries, indptr, indices, colors=palette(colors))
+    solver = Solver(csp=csp, **solver_flags)
+    if local_search:
+        result = solver.min_conflicts_solver()
+    else:
+        result = solver.backjump_solver() if backjumping else solver.backtrack_solver()
+    return {
+        "coloring": dict(result) if result is not None else None,
+        "assignments_number": csp.assignments_number,
+        "nodes": solver.nodes,
+        "time": time.perf_counter() - start,
+    }
+
+
+def main():
+    """
+    Solve-only entry point: colors a continent and writes the result as one JSON line, without drawing it. It
+    starts much faster than main.py, which imports the portfolio, decomposition and plotting modules.
+
+    Command-line arguments:
+    - -m, --map: The continent to color. Must be one of [Asia, Africa, America, Europe].
+    - -lcv, --lcv: Enable least constraint value (LCV) as an order-type optimizer.
+    - -mrv, --mrv: Enable minimum remaining values (MRV) as an order-type optimizer.
+    - -dsatur, --dsatur: Enable saturation degree (DSatur) variable selection instead of MRV.
+    - -ac3, --arc-consistency: Enable arc consistency.
+    - -fc, --forward-checking: Enable forward checking.
+    - -cbj, --backjumping: Use the iterative engine with conflict-directed backjumping.
+    - -mc, --min-conflicts: Use the min-conflicts local search.
+    - -k, --colors: The number of colors that can be assigned. Default is 4.
+    - -ND, --Neighborhood-distance: The neighborhood distance. Default is 1.
+    """
+    parser = argparse.ArgumentParser(
+        prog="Map Coloring Solve",
+        description="Colors a continent and prints the coloring as JSON, without drawing it",
+    )
+    parser.add_argument("-m", "--map", required=True, choices=CONTINENTS, help="Map to color")
+    parser.add_argument("-lcv", "--lcv", action="store_true", help="Enable least constraint value (LCV)")
+    parser.add_argument("-mrv", "--mrv", action="store_true", help="Enable minimum remaining values (MRV)")
+    parser.add_argument("-dsatur", "--dsatur", action="store_true", help="Enable DSatur variable selection")
+    parser.add_argument("-ac3", "--arc-consistency", action="store_true", help="Enable arc consistency")
+    parser.add_argument("-fc", "--forward-checking", action="store_true", help="Enable forward checking")
+    parser.add_argument("-cbj", "--backjumping", action="store_true", help="Use the backjumping engine")
+    parser.add_argument("-mc", "--min-conflicts", action="store_true", help="Use the min-conflicts local search")
+    parser.add_argument("-k", "--colors", type=positive_int, default=4, help="Number of colors, defaults to 4")
+    parser.add_argument("-ND", "--Neighborhood-distance", type=int, default=1, help="Neighborhood distance")
+    args = parser.parse_args()
+
+    result = solve(args.map, distance=args.Neighborhood_distance, colors=args.colors,
+                   backjumping=args.backjumping, local_search=args.min_conflicts, domain_heuristics=args.lcv,
+                   variable_heuristics=args.mrv, AC_3=args.arc_consistency,
+                   forward_checking=args.forward_checking, dsatur=args.dsatur)
+    sys.stdout.write(json.dumps(result) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+import glob
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from CSP import DEFAULT_COLORS
+from graph_index import DATASET_PATH, dataset_digest
+
+_VERSION = 1
+
+
+def graph_hash(countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int]) -> str:
+    """
+    Returns a canonical hash of a map: the countries and the borders between them by name, independent of the
+    order of the countries and of their neighbors.
+
+    Args:
+        countries (Sequence[str]): The countries of the map, in index order.
+        indptr (Sequence[int]): The CSR offsets of the map's adjacency.
+        indices (Sequence[int]): The CSR neighbor indices of the map's adjacency.
+
+    Returns:
+        str: The hexadecimal SHA-1 digest of the map.
+    """
+    borders = sorted((countries[i], countries[j]) for i in range(len(countries))
+                     for j in indices[indptr[i]:indptr[i + 1]] if countries[i] < countries[j])
+    return hashlib.sha1(json.dumps([sorted(countries), borders]).encode()).hexdigest()
+
+
+def settings_key(settings: Dict) -> str:
+    """
+    Returns the canonical JSON form of solver settings, e.g. a configuration of `portfolio.run_configuration`.
+    Settings that are off (False or None) and the default colors are left out, so that equivalent settings
+    share their key.
+    """
+    canonical = {name: value for name, value in settings.items() if value is not None and value is not False}
+    if canonical.get("colors") == DEFAULT_COLORS:
+        del canonical["colors"]
+    return json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+
+
+class SolveCache(object):
+    """
+    A cache of solve results: an in-memory LRU tier and an optional on-disk tier with size-based eviction.
+
+    Results are stored under two kinds of keys. A graph key (`graph_key`) hashes the border graph canonically
+    with the solver settings, so any source of the same map hits it. A map key (`map_key`) names a continent of
+    the dataset, a neighborhood distance and the settings, so a hit skips loading the map as well as the search;
+    it includes the digest of the dataset, and the map keys of an older content of the dataset are dropped from
+    both tiers as soon as a changed dataset is seen.
+
+    Entries of the disk tier are JSON files in `directory`, written atomically; a hit refreshes the modification
+    time of its file and the least recently used files are removed once the files exceed `max_bytes`.
+
+    Attributes:
+        capacity (int): The number of results kept in memory.
+        directory (str): The directory of the disk tier, None without one.
+        max_bytes (int): The total size of the files of the disk tier after which the oldest ones are removed.
+        dataset (str): The path of the CSV dataset the map keys refer to.
+        hits (int): The number of lookups answered, from either tier.
+        disk_hits (int): The number of lookups answered by the disk tier.
+        misses (int): The number of lookups not answered.
+        evictions (int): The number of results evicted from either tier.
+        invalidations (int): The number of times the map keys were dropped because the dataset changed.
+    """
+
+    def __init__(self, capacity: int = 256, directory: Optional[str] = None, max_bytes: int = 64 << 20,
+                 dataset: str = DATASET_PATH) -> None:
+        """
+        Initializes a SolveCache object.
+
+        Args:
+            capacity (int, optional): The number of results kept in memory. Defaults to 256.
+            directory (str, optional): The directory of the disk tier, created if needed. Defaults to None (no
+                                       disk tier).
+            max_bytes (int, optional): The size of the disk tier in bytes. Defaults to 64 MiB.
+            dataset (str, optional): The path of the CSV dataset. Defaults to DATASET_PATH.
+        """
+        self.capacity = capacity
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.dataset = dataset
+        self.hits = self.disk_hits = self.misses = self.evictions = self.invalidations = 0
+        self._entries = OrderedDict()
+        self._digest = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def map_key(self, continent: str, distance: int, settings: Dict) -> str:
+        """
+        Returns the key of a continent of the dataset at a neighborhood distance solved with some settings. The
+        dataset is hashed, not parsed.
+        """
+        digest = dataset_digest(self.dataset)
+        if digest != self._digest:
+            self._invalidate(digest)
+        payload = json.dumps([_VERSION, digest.hex(), continent, distance, settings_key(settings)])
+        return "map-" + hashlib.sha1(payload.encode()).hexdigest()
+
+    def graph_key(self, countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int],
+                  settings: Dict) -> str:
+        """
+        Returns the key of a map solved with some settings, see `graph_hash`.
+        """
+        payload = json.dumps([_VERSION, graph_hash(countries, indptr, indices), settings_key(settings)])
+        return "graph-" + hashlib.sha1(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Looks up a result, in memory first and then on disk.
+
+        Args:
+            key (str): A key returned by `map_key` or `graph_key`.
+
+        Returns:
+            Dict: A copy of the result, whose "solution" is a list of (country, color) tuples or None, or None on
+                  a miss.
+        """
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        elif self.directory is not None:
+            result = self._read(key)
+            if result is not None:
+                self.disk_hits += 1
+                self._remember(key, result)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        result = dict(result)
+        if result.get("solution") is not None:
+            result["solution"] = [tuple(assignment) for assignment in result["solution"]]
+        return result
+
+    def put(self, key: str, result: Dict) -> None:
+        """
+        Stores a result in memory and on disk. The result must be JSON serializable.
+
+        Args:
+            key (str): A key returned by `map_key` or `graph_key`.
+            result (Dict): The result, e.g. the "solution", "assignments", "nodes" and "time" of a solve.
+        """
+        self._remember(key, dict(result))
+        if self.directory is None:
+            return
+        path = self._path(key)
+        try:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(result, f)
+            os.replace(tmp, path)
+        except OSError:
+            return  # read-only or full disk, the result stays in memory only
+        self._evict_files()
+
+    def statistics(self) -> Dict[str, int]:
+        """
+        Returns the hits (and among them the disk hits), misses, evictions and invalidations of the cache, and the
+        number of results in memory.
+        """
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
+
+    def clear(self) -> None:
+        """
+        Removes every result from both tiers.
+        """
+        self._entries.clear()
+        if self.directory is not None:
+            for path in glob.glob(os.path.join(self.directory, "*.json")):
+                _remove(path)
+
+    def _remember(self, key: str, result: Dict) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def _read(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            os.utime(path)  # a hit makes the file the most recently used
+        except (OSError, ValueError):
+            return None
+        return result if isinstance(result, dict) else None
+
+    def _evict_files(self) -> None:
+        files = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+            self.evictions += 1
+
+    def _invalidate(self, digest: bytes) -> None:
+        """
+        Drops the map keys of another content of the dataset, in memory and, when the digest recorded in the
+        directory differs, on disk.
+        """
+        stale = self._digest is not None
+        if stale:
+            for key in [key for key in self._entries if key.startswith("map-")]:
+                del self._entries[key]
+        self._digest = digest
+        if self.directory is not None:
+            marker = os.path.join(self.directory, "dataset")
+            try:
+                with open(marker) as f:
+                    recorded = f.read().strip()
+            except OSError:
+                recorded = None
+            if recorded != digest.hex():
+                if recorded is not None:
+                    stale = True
+                    for path in glob.glob(os.path.join(self.directory, "map-*.json")):
+                        _remove(path)
+                try:
+                    with open(marker, "w") as f:
+                        f.write(digest.hex())
+                except OSError:
+                    pass
+        if stale:
+            self.invalidations += 1
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,70 @@
+import math
+import random
+from array import array
+from typing import List, Tuple
+
+
+def _in_circle(a: Tuple[float, float], b: Tuple[float, float], c: Tuple[float, float], d: Tuple[float, float]) -> bool:
+    """
+    Returns True if `d` lies strictly inside the circumcircle of the counter-clockwise triangle (a, b, c).
+    """
+    ax, ay = a[0] - d[0], a[1] - d[1]
+    bx, by = b[0] - d[0], b[1] - d[1]
+    cx, cy = c[0] - d[0], c[1] - d[1]
+    return ((ax * ax + ay * ay) * (bx * cy - cx * by)
+            - (bx * bx + by * by) * (ax * cy - cx * ay)
+            + (cx * cx + cy * cy) * (ax * by - bx * ay)) > 0
+
+
+def planar_map(regions: int, seed: int = 0, jitter: float = 0.3, drop: float = 0.1) -> Tuple[List[str], array, array]:
+    """
+    Generates a random planar map with `regions` regions: the Delaunay triangulation of a jittered grid of
+    points, where every grid cell is split along the diagonal that satisfies the empty-circle property, with a
+    fraction `drop` of the edges removed so the faces are not all triangles. Removing edges keeps the map planar,
+    so it is always four-colorable.
+
+    Args:
+        regions (int): The number of regions.
+        seed (int, optional): The seed of the random generator. Defaults to 0.
+        jitter (float, optional): The largest displacement of a point from its grid position, in cell sizes.
+                                  Values below 0.5 keep the triangulation inside the grid cells. Defaults to 0.3.
+        drop (float, optional): The probability of removing every edge. Defaults to 0.1.
+
+    Returns:
+        Tuple[List[str], array, array]: The names of the regions and the CSR `indptr` and `indices` arrays of their
+                                        adjacency.
+    """
+    rnd = random.Random(seed)
+    width = max(1, math.ceil(math.sqrt(regions)))
+    height = math.ceil(regions / width)
+    points = [(x + rnd.uniform(-jitter, jitter), y + rnd.uniform(-jitter, jitter))
+              for y in range(height) for x in range(width)]
+
+    adjacency = [[] for _ in range(regions)]
+
+    def connect(u, v):
+        if u < regions and v < regions and rnd.random() >= drop:
+            adjacency[u].append(v)
+            adjacency[v].append(u)
+
+    for y in range(height):
+        for x in range(width):
+            i = y * width + x
+            if x + 1 < width:
+                connect(i, i + 1)
+            if y + 1 < height:
+                connect(i, i + width)
+            if x + 1 < width and y + 1 < height:
+                # cell (i, i + 1, i + width + 1, i + width): keep the diagonal whose triangles have empty circumcircles
+                a, b, c, d = i, i + 1, i + width + 1, i + width
+                if _in_circle(points[a], points[b], points[c], points[d]):
+                    connect(b, d)
+                else:
+                    connect(a, c)
+
+    indptr = array("i", [0])
+    indices = array("i")
+    for neighbors in adjacency:
+        indices.extend(sorted(neighbors))
+        indptr.append(len(indices))
+    return [f"R{i}" for i in range(regions)], indptr, indices
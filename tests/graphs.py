@@ -0,0 +1,46 @@
+import itertools
+import random
+from typing import Iterator, List, Sequence, Tuple
+
+
+def adjacency(n: int, edges: Sequence[Tuple[int, int]]) -> Tuple[List[str], List[int], List[int]]:
+    """
+    Returns the countries "c0", "c1", ... and the CSR adjacency of a graph with `n` nodes and some edges.
+    """
+    neighbors = [set() for _ in range(n)]
+    for a, b in edges:
+        neighbors[a].add(b)
+        neighbors[b].add(a)
+    indptr, indices = [0], []
+    for node in neighbors:
+        indices.extend(sorted(node))
+        indptr.append(len(indices))
+    return [f"c{i}" for i in range(n)], indptr, indices
+
+
+def random_graph(rng: random.Random, n: int, p: float) -> Tuple[List[str], List[int], List[int]]:
+    """
+    Returns a G(n, p) random graph, see `adjacency`.
+    """
+    return adjacency(n, [(a, b) for a, b in itertools.combinations(range(n), 2) if rng.random() < p])
+
+
+def brute_force_colorings(indptr: Sequence[int], indices: Sequence[int], k: int) -> Iterator[Tuple[int, ...]]:
+    """
+    Generates every proper coloring of a graph with `k` colors, as color indices in node order.
+    """
+    n = len(indptr) - 1
+    edges = [(a, b) for a in range(n) for b in indices[indptr[a]:indptr[a + 1]] if a < b]
+    for coloring in itertools.product(range(k), repeat=n):
+        if all(coloring[a] != coloring[b] for a, b in edges):
+            yield coloring
+
+
+def is_proper(solution, countries: Sequence[str], indptr: Sequence[int], indices: Sequence[int]) -> bool:
+    """
+    Checks that a list of (country, color) assignments colors every country differently from its neighbors.
+    """
+    color = dict(solution)
+    return len(color) == len(countries) and all(
+        color[countries[a]] != color[countries[b]] for a in range(len(countries))
+        for b in indices[indptr[a]:indptr[a + 1]])
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from CSP import CSP, palette
+from Solver import Solver
+from graphs import adjacency, brute_force_colorings, is_proper, random_graph
+
+ENGINES = [
+    dict(),
+    dict(dsatur=True),
+    dict(variable_heuristics=True, domain_heuristics=True),
+    dict(dsatur=True, domain_heuristics=True, AC_3=True),
+]
+
+# a graph on which a jump over several frames used to leave DSatur without a variable to select
+JUMP_GRAPH = (52, [
+    (0, 7), (0, 15), (0, 25), (0, 27), (0, 38), (1, 8), (1, 9), (1, 17), (1, 21), (1, 22), (1, 24), (1, 49), (2, 12),
+    (2, 36), (4, 18), (4, 23), (4, 37), (5, 14), (5, 15), (5, 26), (6, 28), (6, 31), (6, 36), (6, 47), (7, 18),
+    (7, 26), (8, 16), (8, 35), (9, 12), (9, 39), (10, 17), (10, 26), (10, 36), (10, 49), (11, 16), (11, 17), (11, 19),
+    (11, 24), (12, 32), (13, 33), (13, 35), (13, 36), (13, 40), (13, 41), (13, 42), (13, 46), (15, 16), (15, 18),
+    (15, 35), (15, 41), (16, 42), (17, 45), (17, 47), (17, 51), (18, 24), (18, 41), (19, 35), (19, 46), (20, 32),
+    (20, 40), (21, 41), (23, 27), (23, 28), (23, 43), (23, 51), (24, 37), (24, 40), (24, 41), (24, 44), (24, 48),
+    (24, 50), (24, 51), (25, 26), (25, 30), (26, 33), (27, 29), (27, 35), (27, 40), (27, 51), (28, 31), (28, 41),
+    (30, 33), (30, 39), (30, 42), (30, 50), (31, 41), (31, 48), (32, 34), (32, 50), (33, 39), (33, 42), (34, 48),
+    (35, 44), (36, 39), (36, 51), (37, 40), (37, 42), (38, 43), (38, 48), (39, 51), (40, 46), (43, 51),
+])
+
+
+@pytest.mark.parametrize("flags", ENGINES)
+def test_backjumping_agrees_with_brute_force(flags):
+    rng = random.Random(7)
+    for _ in range(150):
+        countries, indptr, indices = random_graph(rng, rng.randint(3, 8), rng.uniform(0.3, 0.9))
+        k = rng.choice((2, 3))
+        solver = Solver(CSP.from_adjacency(countries, indptr, indices, colors=palette(k)), **flags)
+        result = solver.backjump_solver()
+        exists = next(brute_force_colorings(indptr, indices, k), None) is not None
+        assert (result is not None) == exists
+        if result is not None:
+            assert is_proper(result, countries, indptr, indices)
+
+
+@pytest.mark.parametrize("flags", ENGINES)
+def test_backjumping_agrees_with_backtracking_on_larger_graphs(flags):
+    rng = random.Random(11)
+    for _ in range(40):
+        n = rng.randint(20, 50)
+        countries, indptr, indices = random_graph(rng, n, rng.uniform(3.5, 5.5) / n)
+        result = Solver(CSP.from_adjacency(countries, indptr, indices, colors=palette(3)), **flags).backjump_solver()
+        expected = Solver(CSP.from_adjacency(countries, indptr, indices, colors=palette(3)),
+                          forward_checking=True, dsatur=True).backtrack_solver()
+        assert (result is None) == (expected is None)
+        if result is not None:
+            assert is_proper(result, countries, indptr, indices)
+
+
+@pytest.mark.parametrize("dsatur", [False, True])
+def test_jump_over_several_frames(dsatur):
+    countries, indptr, indices = adjacency(*JUMP_GRAPH)
+    result = Solver(CSP.from_adjacency(countries, indptr, indices, colors=palette(3)), dsatur=dsatur).backjump_solver()
+    assert result is not None and is_proper(result, countries, indptr, indices)
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from CSP import CSP, palette
+from Solver import Solver
+from graphs import brute_force_colorings, random_graph
+
+
+def canonical(coloring):
+    """Renumbers the colors of a coloring by first appearance, which identifies its permutation class."""
+    order = {}
+    return tuple(order.setdefault(color, len(order)) for color in coloring)
+
+
+def graphs(seed, count=60):
+    rng = random.Random(seed)
+    for _ in range(count):
+        countries, indptr, indices = random_graph(rng, rng.randint(1, 7), rng.uniform(0.1, 0.7))
+        yield rng, countries, indptr, indices, rng.randint(2, 4)
+
+
+def test_count_solutions_agrees_with_brute_force():
+    for _, countries, indptr, indices, k in graphs(1):
+        solver = Solver(CSP.from_adjacency(countries, indptr, indices, colors=palette(k)))
+        assert solver.count_solutions() == sum(1 for _ in brute_force_colorings(indptr, indices, k))
+
+
+def test_count_solutions_with_assigned_countries():
+    for rng, countries, indptr, indices, k in graphs(2):
+        node, color = rng.randrange(len(countries)), rng.randrange(k)
+        csp = CSP.from_adjacency(countries, indptr, indices, colors=palette(k))
+        csp.assign_index(node, color)
+        expected = sum(1 for coloring in brute_force_colorings(indptr, indices, k) if coloring[node] == color)
+        assert Solver(csp).count_solutions() == expected
+
+
+@pytest.mark.parametrize("flags", [dict(), dict(dsatur=True, forward_checking=True)])
+def test_iter_solutions_yields_every_coloring_once(flags):
+    for _, countries, indptr, indices, k in graphs(3):
+        csp = CSP.from_adjacency(countries, indptr, indices, colors=palette(k))
+        colors = {color: c for c, color in enumerate(csp.domain)}
+        found = [tuple(colors[color] for _, color in solution)
+                 for solution in Solver(csp, **flags).iter_solutions(symmetry_breaking=False)]
+        assert len(found) == len(set(found))
+        assert set(found) == set(brute_force_colorings(indptr, indices, k))
+        assert csp.assigned_count == 0 and all(domain == csp.full_domain for domain in csp.domains)
+
+
+def test_iter_solutions_yields_one_coloring_per_permutation_class():
+    for _, countries, indptr, indices, k in graphs(4):
+        csp = CSP.from_adjacency(countries, indptr, indices, colors=palette(k))
+        colors = {color: c for c, color in enumerate(csp.domain)}
+        found = [canonical(colors[color] for _, color in solution) for solution in Solver(csp).iter_solutions()]
+        assert len(found) == len(set(found))
+        assert set(found) == {canonical(coloring) for coloring in brute_force_colorings(indptr, indices, k)}
+
+
+def test_closing_the_generator_restores_the_csp():
+    _, countries, indptr, indices, k = next(graphs(5))
+    csp = CSP.from_adjacency(countries, indptr, indices, colors=palette(4))
+    solutions = Solver(csp).iter_solutions()
+    next(solutions)
+    solutions.close()
+    assert csp.assigned_count == 0 and all(domain == csp.full_domain for domain in csp.domains)
@@ -0,0 +1,77 @@
+import pytest
+
+from CSP import CSP
+
+
+def path_csp(n=4):
+    """A path c0 - c1 - ... of `n` countries."""
+    indptr, indices = [0], []
+    for i in range(n):
+        indices.extend(j for j in (i - 1, i + 1) if 0 <= j < n)
+        indptr.append(len(indices))
+    return CSP.from_adjacency([f"c{i}" for i in range(n)], indptr, indices)
+
+
+def state(csp):
+    return list(csp.domains), list(csp.values), list(csp.assigned_at), csp.assigned_count
+
+
+def test_restore_undoes_assignments_and_prunings():
+    csp = path_csp()
+    before = state(csp)
+    mark = csp.checkpoint()
+    assert csp.assign_index(0, 0)
+    assert csp.prune(1, 1 << 0)
+    inner = csp.checkpoint()
+    assert csp.assign_index(1, 1)
+    assert csp.prune(2, 1 << 1)
+    assert not csp.prune(3, csp.full_domain)  # wipeout
+
+    csp.restore(inner)
+    assert csp.values[1] == -1 and csp.domains[2] == csp.full_domain and csp.domains[3] == csp.full_domain
+    assert csp.values[0] == 0 and not csp.domains[1] & 1
+    csp.restore(mark)
+    assert state(csp) == before
+
+
+def test_restore_keeps_the_support_table_up_to_date():
+    csp = path_csp()
+    csp.enable_support()
+    support = list(csp.support)
+    mark = csp.checkpoint()
+    csp.assign_index(1, 2)
+    csp.prune(2, 1 << 3)
+    assert csp.support != support
+    csp.restore(mark)
+    assert csp.support == support
+
+
+def test_unassign_restores_what_the_assignment_changed():
+    csp = path_csp()
+    before = state(csp)
+    csp.assign("c1", "red")
+    csp.prune(0, 1 << 0)
+    csp.unassign("c1")
+    assert state(csp) == before
+    csp.assign("c1", "red")
+    csp.unassign(variable="c1")
+    assert state(csp) == before
+
+
+def test_unassign_accepts_the_former_signature_with_a_warning():
+    csp = path_csp()
+    before = state(csp)
+    csp.assign("c2", "green")
+    with pytest.warns(DeprecationWarning):
+        csp.unassign([("c1", "green"), ("c3", "green")], "c2")
+    assert state(csp) == before
+    csp.assign("c2", "green")
+    with pytest.warns(DeprecationWarning):
+        csp.unassign([], variable="c2")
+    assert state(csp) == before
+
+
+@pytest.mark.parametrize("args", [(), ("a", "b", "c2")])
+def test_unassign_rejects_other_argument_counts(args):
+    with pytest.raises(TypeError):
+        path_csp().unassign(*args)
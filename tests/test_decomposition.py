@@ -0,0 +1,69 @@
+import random
+
+from CSP import CSP, palette
+from Solver import Solver
+from decomposition import biconnected_components, merge_blocks, solve_decomposed
+from graph_index import induced_subgraph
+from graphs import adjacency, is_proper, random_graph
+
+# the triangles 0-1-2 and 2-3-4, the square 4-5-6-7, the bridge 6-8 and the pendant edge 8-9: five blocks around
+# the articulation points 2, 4, 6 and 8
+BLOCK_GRAPH = (10, [(0, 1), (1, 2), (0, 2), (2, 3), (3, 4), (2, 4), (4, 5), (5, 6), (6, 7), (7, 4), (6, 8), (8, 9)])
+
+
+def color_blocks(blocks, indptr, indices, rng, k=4):
+    """Colors every block on its own, with its colors shuffled so that blocks disagree on shared nodes."""
+    colorings = []
+    for block in blocks:
+        sub_indptr, sub_indices = induced_subgraph(indptr, indices, block)
+        csp = CSP.from_adjacency([str(node) for node in block], sub_indptr, sub_indices, colors=palette(k))
+        assert Solver(csp, forward_checking=True).backtrack_solver() is not None
+        shuffled = rng.sample(range(k), k)
+        colorings.append([shuffled[value] for value in csp.values])
+    return colorings
+
+
+def assert_proper(color, n, indptr, indices):
+    assert sorted(color) == list(range(n))
+    for a in range(n):
+        for b in indices[indptr[a]:indptr[a + 1]]:
+            assert color[a] != color[b]
+
+
+def test_blocks_share_only_articulation_points():
+    _, indptr, indices = adjacency(*BLOCK_GRAPH)
+    blocks = biconnected_components(indptr, indices)
+    shared = {}
+    for block in blocks:
+        for node in block:
+            shared[node] = shared.get(node, 0) + 1
+    assert {node for node, count in shared.items() if count > 1} == {2, 4, 6, 8}
+    edges = {(a, b) for a in range(len(indptr) - 1) for b in indices[indptr[a]:indptr[a + 1]] if a < b}
+    covered = {(a, b) for block in blocks for a in block for b in block if (a, b) in edges}
+    assert covered == edges
+
+
+def test_merge_blocks_keeps_articulation_points_consistent():
+    rng = random.Random(3)
+    _, indptr, indices = adjacency(*BLOCK_GRAPH)
+    blocks = biconnected_components(indptr, indices)
+    for _ in range(20):
+        color = merge_blocks(blocks, color_blocks(blocks, indptr, indices, rng))
+        assert_proper(color, len(indptr) - 1, indptr, indices)
+
+
+def test_merge_blocks_on_random_sparse_graphs():
+    rng = random.Random(5)
+    for _ in range(50):
+        n = rng.randint(5, 40)
+        _, indptr, indices = random_graph(rng, n, rng.uniform(1.0, 2.5) / n)
+        blocks = biconnected_components(indptr, indices)
+        color = merge_blocks(blocks, color_blocks(blocks, indptr, indices, rng))
+        assert_proper(color, n, indptr, indices)
+
+
+def test_solve_decomposed_with_blocks():
+    countries, indptr, indices = adjacency(*BLOCK_GRAPH)
+    result, stats = solve_decomposed(countries, indptr, indices, biconnected=True)
+    assert stats["parts"] == 5
+    assert is_proper(result, countries, indptr, indices)
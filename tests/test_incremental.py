@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from CSP import CSP
+from Solver import Solver
+from incremental import IncrementalColoring, diff_borders
+from synthetic import planar_map
+
+K4 = {"A": ["B", "C", "D"], "B": ["C", "D"], "C": ["D"], "D": []}
+K4_COLORING = {"A": "red", "B": "green", "C": "blue", "D": "yellow"}
+
+
+def assert_valid(incremental):
+    coloring = incremental.coloring
+    assert set(coloring) | incremental.uncolored == set(incremental.neighbors)
+    for country, neighbors in incremental.neighbors.items():
+        for neighbor in neighbors:
+            assert country not in coloring or neighbor not in coloring or coloring[country] != coloring[neighbor]
+
+
+def test_a_conflicting_border_is_repaired_locally():
+    incremental = IncrementalColoring({"A": ["B"], "B": ["C"], "C": [], "D": ["E"], "E": []},
+                                      {"A": "red", "B": "green", "C": "red", "D": "red", "E": "green"})
+    changed, stats = incremental.apply(added_borders=[("A", "C")])
+    assert stats["conflicts"] == 1 and len(changed) == 1
+    assert incremental.coloring["D"] == "red" and incremental.coloring["E"] == "green"
+    assert_valid(incremental)
+
+
+def test_an_infeasible_edit_is_retried_by_the_next_one():
+    incremental = IncrementalColoring(K4, K4_COLORING)
+    changed, stats = incremental.apply(added_countries=["E"], added_borders=[("E", other) for other in "ABCD"])
+    assert changed is None
+    assert incremental.uncolored == {"E"} and "E" not in incremental.coloring
+    assert_valid(incremental)
+
+    changed, stats = incremental.apply(removed_borders=[("E", "A")])
+    assert stats["conflicts"] == 1
+    assert changed == {"E": incremental.coloring["A"]}
+    assert not incremental.uncolored
+    assert_valid(incremental)
+
+
+def test_countries_missing_from_the_initial_coloring_are_colored_by_the_first_edit():
+    incremental = IncrementalColoring(K4, {"A": "red", "B": "green"})
+    changed, _ = incremental.apply()
+    assert set(changed) >= {"C", "D"} and not incremental.uncolored
+    assert_valid(incremental)
+
+
+def test_a_border_to_a_removed_country_is_rejected():
+    incremental = IncrementalColoring(K4, K4_COLORING)
+    with pytest.raises(ValueError):
+        incremental.apply(removed_countries=["D"], added_countries=["E"], added_borders=[("D", "E")])
+    assert set(incremental.neighbors) == set(K4) and incremental.coloring == K4_COLORING
+    changed, _ = incremental.apply(removed_countries=["D"], added_countries=["D"], added_borders=[("D", "A")])
+    assert "D" in changed
+    assert_valid(incremental)
+
+
+def test_random_edits_keep_the_map_colored():
+    rng = random.Random(1)
+    countries, indptr, indices = planar_map(300, seed=1)
+    solution = Solver(CSP.from_adjacency(countries, indptr, indices), dsatur=True).backjump_solver()
+    incremental = IncrementalColoring.from_adjacency(countries, indptr, indices, dict(solution))
+    for step in range(100):
+        a, b = rng.sample(sorted(incremental.neighbors), 2)
+        if rng.random() < 0.5:
+            incremental.apply(added_countries=[f"new{step}"], added_borders=[(f"new{step}", a), (f"new{step}", b)])
+        else:
+            incremental.apply(removed_countries=[a])
+        assert not incremental.uncolored
+        assert_valid(incremental)
+
+
+def test_diff_borders_turns_two_maps_into_an_edit():
+    old = {"A": ["B"], "B": ["C"], "C": [], "D": ["A"]}
+    new = {"A": ["B", "C"], "B": [], "C": [], "E": ["C"]}
+    edit = diff_borders(old, new)
+    assert edit == {"added_countries": ["E"], "removed_countries": ["D"],
+                    "added_borders": [("A", "C"), ("C", "E")], "removed_borders": [("B", "C")]}
+    incremental = IncrementalColoring(old, {"A": "red", "B": "green", "C": "red", "D": "green"})
+    incremental.apply(**edit)
+    assert set(incremental.neighbors) == set(new) and not incremental.uncolored
+    assert_valid(incremental)
@@ -0,0 +1,70 @@
+import os
+
+from solve_cache import SolveCache, graph_hash
+from graphs import adjacency
+
+RESULT = {"solution": [["A", "red"], ["B", "green"]], "assignments": 2, "nodes": 2, "time": 0.001}
+
+
+def dataset(tmp_path, content="iso_a3,continent,neighbors\n"):
+    path = tmp_path / "dataset.csv"
+    path.write_text(content)
+    return str(path)
+
+
+def test_map_keys_are_dropped_when_the_dataset_changes(tmp_path):
+    path = dataset(tmp_path)
+    cache = SolveCache(directory=str(tmp_path / "cache"), dataset=path)
+    map_key = cache.map_key("Europe", 1, {"dsatur": True})
+    countries, indptr, indices = adjacency(2, [(0, 1)])
+    graph_key = cache.graph_key(countries, indptr, indices, {"dsatur": True})
+    cache.put(map_key, RESULT)
+    cache.put(graph_key, RESULT)
+    assert cache.get(map_key)["solution"] == [("A", "red"), ("B", "green")]
+
+    dataset(tmp_path, "iso_a3,continent,neighbors\nAAA,Europe,\n")
+    new_key = cache.map_key("Europe", 1, {"dsatur": True})
+    assert new_key != map_key
+    assert cache.invalidations == 1
+    assert cache.get(map_key) is None and cache.get(new_key) is None
+    assert not any(name.startswith("map-") for name in os.listdir(tmp_path / "cache"))
+    assert cache.get(graph_key) is not None  # the border graph did not change
+
+
+def test_a_new_process_drops_the_disk_entries_of_an_older_dataset(tmp_path):
+    path = dataset(tmp_path)
+    directory = str(tmp_path / "cache")
+    first = SolveCache(directory=directory, dataset=path)
+    key = first.map_key("Asia", 2, {})
+    first.put(key, RESULT)
+    assert SolveCache(directory=directory, dataset=path).get(key) is not None
+
+    dataset(tmp_path, "changed\n")
+    later = SolveCache(directory=directory, dataset=path)
+    later.map_key("Asia", 2, {})
+    assert later.invalidations == 1
+    assert later.get(key) is None
+
+
+def test_lru_and_disk_eviction(tmp_path):
+    cache = SolveCache(capacity=2, dataset=dataset(tmp_path))
+    for key in ("a", "b", "c"):
+        cache.put(key, RESULT)
+    assert cache.get("a") is None and cache.get("c") is not None
+    assert cache.evictions == 1
+
+    directory = tmp_path / "small"
+    cache = SolveCache(capacity=1, directory=str(directory), max_bytes=300, dataset=dataset(tmp_path))
+    for key in ("a", "b", "c", "d"):
+        cache.put(key, RESULT)
+    assert sum(os.path.getsize(directory / name) for name in os.listdir(directory) if name.endswith(".json")) <= 300
+    assert cache.get("d") is not None
+
+
+def test_graph_hash_ignores_the_order_of_countries():
+    countries, indptr, indices = adjacency(3, [(0, 1), (1, 2)])
+    reordered, reordered_indptr, reordered_indices = adjacency(3, [(2, 1), (1, 0)])
+    names = {"c0": "c2", "c1": "c1", "c2": "c0"}
+    assert graph_hash(countries, indptr, indices) == graph_hash([names[c] for c in reordered], reordered_indptr,
+                                                                reordered_indices)
+    assert graph_hash(countries, indptr, indices) != graph_hash(*adjacency(3, [(0, 1), (0, 2)]))